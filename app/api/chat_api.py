@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Request, Depends
-from typing import List, Optional
+from fastapi import APIRouter, Request, Depends, HTTPException
+from typing import List, Literal, Optional
 from pydantic import BaseModel
 from app.services.chat_service import search, analyze
-from app.services.user_service import update_analyze_api_tokens_usage
-from app.services.user_service import update_search_api_tokens_usage
+from app.services.user_service import commit_api_token
+from app.services.user_service import release_api_token
 from app.services.user_service import log_user_api_request
+from app.services.user_service import get_user_plan
+from app.services.popular_query_service import get_precomputed_response
+from app.config import settings
+import asyncio
+import time
 from app.utils.auth import authenticate_user
-from app.utils.auth import ensure_authorised_access
+from app.utils.auth import reserve_authorised_access
 from app.utils.auth import extract_user_email
+from app.utils.admission import analyze_admission_controller, AdmissionRejected
+from app.utils.cancellation import run_until_disconnected, ClientDisconnected
 
 router = APIRouter(
     dependencies=[Depends(authenticate_user)]
@@ -20,34 +27,84 @@ class SearchRequest(BaseModel):
     company_sizes: Optional[List[str]] = None,
     project_budgets: Optional[List[str]] = None,
     limit:Optional[int]=500
+    deadline_ms: Optional[int] = None
+    analyze_mode: Optional[Literal["llm", "extractive"]] = "llm"
 
 @router.post("/search/")
-async def chat(request: SearchRequest, httpRequest: Request, _: None = Depends(authenticate_user)):
+async def chat(request: SearchRequest, httpRequest: Request):
+    started_at = time.monotonic()
     email = extract_user_email(httpRequest)
-    await ensure_authorised_access("search", email)
-    results = await search(
-        query=request.query,
-        review_date_from=request.review_date_from,
-        industries=request.industries,
-        company_sizes=request.company_sizes,
-        project_budgets=request.project_budgets,
-        limit=request.limit
-    )
-    await update_search_api_tokens_usage(email)
-    await log_user_api_request(email, "Search", request)
+    reservation = await reserve_authorised_access("search", email)
+    precomputed = await get_precomputed_response("Search", request.dict()) if settings.POPULAR_QUERIES_ENABLED else None
+    if precomputed is not None:
+        await commit_api_token(reservation)
+        await log_user_api_request(email, "Search", request, (time.monotonic() - started_at) * 1000)
+        return {"response": precomputed}
+    try:
+        results = await search(
+            query=request.query,
+            review_date_from=request.review_date_from,
+            industries=request.industries,
+            company_sizes=request.company_sizes,
+            project_budgets=request.project_budgets,
+            limit=request.limit
+        )
+    except BaseException:
+        await release_api_token(reservation)
+        raise
+    await commit_api_token(reservation)
+    await log_user_api_request(email, "Search", request, (time.monotonic() - started_at) * 1000)
     return {"response": results}
 
 @router.post("/analyze/")
-async def chat(request: SearchRequest, httpRequest: Request, _: None = Depends(authenticate_user)):
+async def chat(request: SearchRequest, httpRequest: Request):
+    started_at = time.monotonic()
     email = extract_user_email(httpRequest)
-    await ensure_authorised_access("analyze", email)
-    results = await analyze(
-        query=request.query,
-        review_date_from=request.review_date_from,
-        industries=request.industries,
-        company_sizes=request.company_sizes,
-        project_budgets=request.project_budgets
-    )
-    await update_analyze_api_tokens_usage(email)
-    await log_user_api_request(email, "Analyze", request)
-    return {"response": results}
\ No newline at end of file
+    reservation = await reserve_authorised_access("analyze", email)
+    # Precomputed answers skip admission control, as they make no upstream calls.
+    precomputed = await get_precomputed_response("Analyze", request.dict()) if settings.POPULAR_QUERIES_ENABLED else None
+    if precomputed is not None:
+        await commit_api_token(reservation)
+        await log_user_api_request(email, "Analyze", request, (time.monotonic() - started_at) * 1000)
+        return {"response": precomputed, "degradations": []}
+    plan = get_user_plan(reservation["user"])
+    # Admission leases are not renewed, so an analysis has to finish before its lease expires.
+    max_deadline_ms = settings.ADMISSION_LEASE_TTL_MS - settings.ADMISSION_LEASE_MARGIN_MS
+    deadline_ms = min(request.deadline_ms or settings.ANALYZE_DEADLINE_MS_BY_PLAN.get(plan) or max_deadline_ms, max_deadline_ms)
+    queued_at = time.monotonic()
+    try:
+        lease = await analyze_admission_controller.acquire(email, plan)
+    except AdmissionRejected as e:
+        await release_api_token(reservation)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except BaseException:
+        await release_api_token(reservation)
+        raise
+    if deadline_ms:
+        # Time spent waiting for admission counts against the request's deadline.
+        deadline_ms = max(1, deadline_ms - int((time.monotonic() - queued_at) * 1000))
+    try:
+        results, degradations = await run_until_disconnected(httpRequest, analyze(
+            query=request.query,
+            review_date_from=request.review_date_from,
+            industries=request.industries,
+            company_sizes=request.company_sizes,
+            project_budgets=request.project_budgets,
+            deadline_ms=deadline_ms,
+            mode=request.analyze_mode
+        ), settings.DISCONNECT_POLL_INTERVAL_MS)
+    except ClientDisconnected:
+        # Nothing was delivered, so the token is not charged.
+        await release_api_token(reservation)
+        raise HTTPException(status_code=499, detail="Client closed request.")
+    except asyncio.TimeoutError:
+        await release_api_token(reservation)
+        raise HTTPException(status_code=504, detail="Analysis could not be completed within the deadline.")
+    except BaseException:
+        await release_api_token(reservation)
+        raise
+    finally:
+        await analyze_admission_controller.release(lease)
+    await commit_api_token(reservation)
+    await log_user_api_request(email, "Analyze", request, (time.monotonic() - started_at) * 1000)
+    return {"response": results, "degradations": degradations}
\ No newline at end of file
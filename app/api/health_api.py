@@ -0,0 +1,10 @@
+from fastapi import APIRouter, HTTPException
+from app.warmup import warm_up_status
+
+router = APIRouter()
+
+@router.get("/ready/")
+async def ready():
+    if not warm_up_status["ready"]:
+        raise HTTPException(status_code=503, detail=warm_up_status)
+    return {"response": warm_up_status}
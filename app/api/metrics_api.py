@@ -0,0 +1,8 @@
+from fastapi import APIRouter
+from app.utils.metrics import snapshot
+
+router = APIRouter()
+
+@router.get("/metrics/")
+async def metrics():
+    return {"response": snapshot()}
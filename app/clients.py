@@ -0,0 +1,105 @@
+import inspect
+from typing import Callable, Optional
+from app.config import settings
+
+class LazyClient:
+    """Builds an upstream client on first use instead of at import.
+
+    Attribute access is forwarded to the built client, so a LazyClient stands in wherever
+    the client itself was used. Its own names (resolve, override, created, release) avoid
+    the clients' methods such as get and close. Tests call override() with a fake before
+    the first use.
+    """
+
+    def __init__(self, name: str, factory: Callable, close: Optional[Callable] = None):
+        self._name = name
+        self._factory = factory
+        self._close = close
+        self._client = None
+
+    def resolve(self):
+        if self._client is None:
+            self._client = self._factory()
+        return self._client
+
+    @property
+    def created(self) -> bool:
+        return self._client is not None
+
+    def override(self, client):
+        self._client = client
+
+    async def release(self):
+        client, self._client = self._client, None
+        if client is None or self._close is None:
+            return
+        try:
+            result = self._close(client)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            print(f"Client {self._name} can not be closed: {e}")
+
+    def __getattr__(self, attr: str):
+        return getattr(self.resolve(), attr)
+
+def build_mongo_client():
+    from motor.motor_asyncio import AsyncIOMotorClient
+    return AsyncIOMotorClient(settings.MONGO_URI)
+
+# SDK retries are disabled: UpstreamScheduler is the only retry layer, and it has to see
+# every 429 to back off.
+def build_embedding_client():
+    from openai import AzureOpenAI
+    return AzureOpenAI(
+        api_version=settings.EMBEDDING_API_VERSION,
+        api_key=settings.EMBEDDING_KEY,
+        azure_endpoint=settings.EMBEDDING_ENDPOINT,
+        max_retries=0
+    )
+
+def build_search_client():
+    from azure.search.documents import SearchClient
+    from azure.core.credentials import AzureKeyCredential
+    return SearchClient(
+        endpoint=settings.SEARCH_ENDPOINT,
+        index_name=settings.SEARCH_INDEX_NAME,
+        credential=AzureKeyCredential(settings.SEARCH_API_KEY),
+        retry_total=0
+    )
+
+def build_completion_client():
+    from openai import AsyncOpenAI
+    #return AzureOpenAI(
+    #    api_version=settings.COMPLETION_API_VERSION,
+    #    azure_endpoint=settings.AZURE_COMPLETION_ENDPOINT,
+    #    api_key=settings.AZURE_OPENAI_KEY
+    #)
+    return AsyncOpenAI(
+        api_key=settings.AZURE_OPENAI_KEY,
+        max_retries=0
+    )
+
+def build_http_client():
+    import httpx
+    return httpx.AsyncClient(
+        timeout=10,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+    )
+
+mongo_client = LazyClient("mongo", build_mongo_client, close=lambda client: client.close())
+embedding_client = LazyClient("embedding", build_embedding_client, close=lambda client: client.close())
+search_client = LazyClient("search", build_search_client, close=lambda client: client.close())
+completion_client = LazyClient("completion", build_completion_client, close=lambda client: client.close())
+http_client = LazyClient("http", build_http_client, close=lambda client: client.aclose())
+
+CLIENTS = [mongo_client, embedding_client, search_client, completion_client, http_client]
+
+def warm_up_clients(clients: list = CLIENTS):
+    """Builds the clients before serving, so the first requests do not pay for their imports."""
+    for client in clients:
+        client.resolve()
+
+async def close_clients(clients: list = CLIENTS):
+    for client in clients:
+        await client.release()
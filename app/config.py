@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pathlib import Path
+from typing import Optional
 
 class Settings(BaseSettings):
     MONGO_URI: str
@@ -22,6 +23,80 @@ class Settings(BaseSettings):
     COMPLETION_API_VERSION: str
     EMBEDDING_MODEL_NAME: str
     GOOGLE_CLIENT_ID: str
+    EMBEDDING_BATCH_MAX_SIZE: int = 16
+    EMBEDDING_BATCH_MAX_WAIT_MS: int = 5
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 1000
+    COMPLETION_MODEL_NAME: str = "gpt-4o-mini"
+    UPSTREAM_LIMITS: dict = {
+        "gpt-4o-mini": {"rpm": 500, "tpm": 200000},
+        "text-embedding-3-small": {"rpm": 3000, "tpm": 1000000},
+        "azure-search": {"rpm": 3000}
+    }
+    UPSTREAM_MAX_RETRIES: int = 4
+    UPSTREAM_BACKOFF_BASE_MS: int = 500
+    UPSTREAM_BACKOFF_MAX_MS: int = 20000
+    UPSTREAM_CONCURRENCY: int = 16
+    UPSTREAM_MIN_CONCURRENCY: int = 1
+    UPSTREAM_MAX_CONCURRENCY: int = 64
+    PLAN_TIERS: dict = {"enterprise": 1000, "pro": 100, "free": 0}
+    ANALYZE_DEADLINE_MS_BY_PLAN: dict = {"enterprise": 60000, "pro": 45000, "free": 30000}
+    ANALYZE_REDUCED_RETRIEVAL_BELOW_MS: int = 20000
+    ANALYZE_REDUCED_RETRIEVAL_TOP: int = 12
+    ANALYZE_REDUCE_RESERVE_MS: int = 8000
+    ANALYZE_MIN_MAP_BUDGET_MS: int = 4000
+    ANALYZE_EXTRACTIVE_SENTENCES: int = 2
+    REVIEW_DEDUPE_ENABLED: bool = True
+    REVIEW_DEDUPE_THRESHOLD: float = 0.8
+    REVIEW_MINHASH_FIELD: Optional[str] = None
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_CACHE_MAX_TTL_SECONDS: int = 3600
+    AUTH_CERTS_MIN_REFRESH_SECONDS: int = 60
+    QUOTA_LEASE_SIZE: int = 1
+    QUOTA_LEASE_TTL_SECONDS: int = 30
+    USER_REQUESTS_LOG_MAX_QUEUE_SIZE: int = 10000
+    USER_REQUESTS_LOG_BATCH_SIZE: int = 500
+    USER_REQUESTS_LOG_FLUSH_INTERVAL_MS: int = 1000
+    ADMISSION_BACKEND: str = "local"
+    ADMISSION_ANALYZE_USER_LIMIT: int = 2
+    ADMISSION_ANALYZE_GLOBAL_LIMIT: int = 32
+    ADMISSION_QUEUE_TIMEOUT_MS: int = 15000
+    ADMISSION_LEASE_TTL_MS: int = 120000
+    ADMISSION_LEASE_MARGIN_MS: int = 10000
+    ADMISSION_POLL_INTERVAL_MS: int = 250
+    ADMISSION_PLAN_PRIORITIES: dict = {"enterprise": 0, "pro": 1, "free": 2}
+    DISCONNECT_POLL_INTERVAL_MS: int = 250
+    PROFILES_PAGE_SIZE: int = 50
+    PROFILES_MAX_PAGE_SIZE: int = 200
+    PROFILES_SEARCH_TOP_K: int = 20
+    GRAPHQL_DOCUMENT_CACHE_SIZE: int = 256
+    GRAPHQL_PERSISTED_QUERIES_MAX_ENTRIES: int = 1000
+    GRAPHQL_MAX_QUERY_COST: int = 50000
+    GRAPHQL_LIST_SIZES: dict = {"reviews": 20, "content": 4, "servicesProvided": 5, "allCategories": 5, "focus": 5, "searchProfiles": 20}
+    GRAPHQL_FIELD_COSTS: dict = {"aggregates": 1000}
+    RESULT_CACHE_BACKEND: str = "local"
+    PROFILES_CACHE_MAX_ENTRIES: int = 500
+    PROFILES_CACHE_TTL_SECONDS: int = 600
+    PROFILES_CACHE_CHANGE_STREAM_ENABLED: bool = False
+    REVIEW_KEYWORD_INDEX_ENABLED: bool = False
+    CLIENTS_WARM_UP_ENABLED: bool = True
+    WARM_UP_ENABLED: bool = True
+    WARM_UP_STEPS: list = ["connections", "patterns", "graphql", "recent_queries"]
+    WARM_UP_TIMEOUT_SECONDS: int = 30
+    WARM_UP_RECENT_QUERIES: int = 0
+    WARM_UP_RECENT_QUERIES_SCAN: int = 1000
+    POPULAR_QUERIES_ENABLED: bool = False
+    POPULAR_QUERIES_JOB_ENABLED: bool = False
+    POPULAR_QUERIES_TOP_N: int = 20
+    POPULAR_QUERIES_MIN_COUNT: int = 3
+    POPULAR_QUERIES_WINDOW_DAYS: int = 7
+    POPULAR_QUERIES_SCAN_LIMIT: int = 1000
+    POPULAR_QUERIES_CONCURRENCY: int = 2
+    POPULAR_QUERIES_INTERVAL_SECONDS: int = 900
+    POPULAR_QUERIES_REFRESH_AFTER_SECONDS: int = 1800
+    POPULAR_QUERIES_MAX_AGE_SECONDS: int = 3600
+    POPULAR_QUERIES_MAX_ENTRIES: int = 200
+    USAGE_ROLLUPS_ENABLED: bool = True
+    USAGE_HISTORY_MAX_DAYS: int = 90
 
     class Config:
         env_file = str(Path(__file__).resolve().parent / ".env")
@@ -1,13 +1,40 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from app.clients import mongo_client
 from app.config import settings
 
-client = AsyncIOMotorClient(settings.MONGO_URI)
-database = client[settings.MONGO_DB_NAME]
-company_profiles = database["company_profiles"]
-reviews = database["reviews"]
-reviews_with_embeddings = database["reviews_with_embeddings"]
-new_reviews = database["new_reviews"]
-company_profiles_v2 = database["company_profiles_v2"]
-users = database["users"]
-user_requests = database["user_requests"]
-reviews_structured = database["reviews_structured"]
\ No newline at end of file
+class LazyCollection:
+    """Resolves the collection from the lazily built Mongo client on first use."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._client = None
+        self._collection = None
+
+    def resolve(self):
+        client = mongo_client.resolve()
+        if client is not self._client:
+            self._client, self._collection = client, client[settings.MONGO_DB_NAME][self.name]
+        return self._collection
+
+    def __getattr__(self, attr: str):
+        return getattr(self.resolve(), attr)
+
+class LazyDatabase:
+    def resolve(self):
+        return mongo_client.resolve()[settings.MONGO_DB_NAME]
+
+    def __getitem__(self, name: str):
+        return self.resolve()[name]
+
+    def __getattr__(self, attr: str):
+        return getattr(self.resolve(), attr)
+
+database = LazyDatabase()
+company_profiles = LazyCollection("company_profiles")
+reviews = LazyCollection("reviews")
+reviews_with_embeddings = LazyCollection("reviews_with_embeddings")
+new_reviews = LazyCollection("new_reviews")
+company_profiles_v2 = LazyCollection("company_profiles_v2")
+users = LazyCollection("users")
+user_requests = LazyCollection("user_requests")
+user_usage_rollups = LazyCollection("user_usage_rollups")
+reviews_structured = LazyCollection("reviews_structured")
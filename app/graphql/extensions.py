@@ -0,0 +1,126 @@
+import hashlib
+from collections import OrderedDict
+from graphql import (
+    ExecutionResult as GraphQLExecutionResult,
+    DocumentNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    IntValueNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+    VariableNode
+)
+from strawberry.extensions import SchemaExtension
+from app.config import settings
+from app.utils import metrics
+
+_persisted_queries = OrderedDict()
+
+def get_persisted_query(query_hash: str):
+    query = _persisted_queries.get(query_hash)
+    if query is not None:
+        _persisted_queries.move_to_end(query_hash)
+    return query
+
+def set_persisted_query(query_hash: str, query: str):
+    _persisted_queries[query_hash] = query
+    _persisted_queries.move_to_end(query_hash)
+    while len(_persisted_queries) > settings.GRAPHQL_PERSISTED_QUERIES_MAX_ENTRIES:
+        _persisted_queries.popitem(last=False)
+
+class PersistedQueries(SchemaExtension):
+    """Automatic persisted queries, as sent by Apollo clients.
+
+    The client sends extensions.persistedQuery.sha256Hash without the query text. On
+    PERSISTED_QUERY_NOT_FOUND it retries once with the text, which is then stored under
+    the hash. Resolved texts hit the parser and validation caches like any other query.
+    """
+
+    def on_operation(self):
+        execution_context = self.execution_context
+        persisted_query = (execution_context.operation_extensions or {}).get("persistedQuery")
+
+        if persisted_query:
+            query_hash = persisted_query.get("sha256Hash")
+            if execution_context.query:
+                if hashlib.sha256(execution_context.query.encode("utf-8")).hexdigest() != query_hash:
+                    raise GraphQLError("provided sha does not match query", extensions={"code": "PERSISTED_QUERY_HASH_MISMATCH"})
+                set_persisted_query(query_hash, execution_context.query)
+            else:
+                execution_context.query = get_persisted_query(query_hash)
+                if execution_context.query is None:
+                    metrics.increment("graphql_persisted_query_misses_total")
+                    raise GraphQLError("PersistedQueryNotFound", extensions={"code": "PERSISTED_QUERY_NOT_FOUND"})
+                metrics.increment("graphql_persisted_query_hits_total")
+
+        yield
+
+def get_int_argument(field: FieldNode, name: str, variables: dict):
+    for argument in field.arguments or ():
+        if argument.name.value != name:
+            continue
+        if isinstance(argument.value, VariableNode):
+            return variables.get(argument.value.name.value)
+        if isinstance(argument.value, IntValueNode):
+            return int(argument.value.value)
+    return None
+
+def selection_set_cost(selection_set: SelectionSetNode, fragments: dict, variables: dict, page_size: int) -> int:
+    cost = 0
+    for selection in selection_set.selections:
+        if isinstance(selection, FragmentSpreadNode):
+            cost += selection_set_cost(fragments[selection.name.value].selection_set, fragments, variables, page_size)
+            continue
+        if not isinstance(selection, FieldNode):
+            # Inline fragments.
+            cost += selection_set_cost(selection.selection_set, fragments, variables, page_size)
+            continue
+
+        name = selection.name.value
+        if name.startswith("__"):
+            continue
+
+        # Connection edges are as many as the first argument of the field that returns the connection,
+        # ranked lists as their top argument.
+        if name == "edges":
+            size = page_size
+        else:
+            size = get_int_argument(selection, "top", variables) or settings.GRAPHQL_LIST_SIZES.get(name, 1)
+        children = 0
+        if selection.selection_set:
+            first = get_int_argument(selection, "first", variables) or settings.PROFILES_PAGE_SIZE
+            children = selection_set_cost(selection.selection_set, fragments, variables, first)
+        cost += size * (settings.GRAPHQL_FIELD_COSTS.get(name, 1) + children)
+    return cost
+
+def estimate_query_cost(document: DocumentNode, operation_name: str = None, variables: dict = None) -> int:
+    """Upper bound of the objects an operation can resolve, weighing list fields by their expected size."""
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions if isinstance(definition, FragmentDefinitionNode)
+    }
+    for definition in document.definitions:
+        if isinstance(definition, OperationDefinitionNode) and (
+            operation_name is None or (definition.name and definition.name.value == operation_name)
+        ):
+            return selection_set_cost(definition.selection_set, fragments, variables or {}, settings.PROFILES_PAGE_SIZE)
+    return 0
+
+class QueryCostLimiter(SchemaExtension):
+    """Rejects operations estimated above GRAPHQL_MAX_QUERY_COST after validation, before any resolver runs."""
+
+    def on_execute(self):
+        execution_context = self.execution_context
+        cost = estimate_query_cost(execution_context.graphql_document, execution_context.operation_name, execution_context.variables)
+        metrics.observe("graphql_query_cost", cost, metrics.COST_BUCKETS)
+
+        if cost > settings.GRAPHQL_MAX_QUERY_COST:
+            metrics.increment("graphql_query_cost_rejected_total")
+            execution_context.result = GraphQLExecutionResult(data=None, errors=[GraphQLError(
+                f"Query cost {cost} exceeds the limit of {settings.GRAPHQL_MAX_QUERY_COST}.",
+                extensions={"code": "QUERY_TOO_EXPENSIVE", "cost": cost, "maxCost": settings.GRAPHQL_MAX_QUERY_COST}
+            )])
+
+        yield
@@ -0,0 +1,47 @@
+import strawberry
+from typing import Iterable, List
+from strawberry.types.nodes import SelectedField
+
+def flatten_selections(selections: Iterable) -> Iterable[SelectedField]:
+    for selection in selections:
+        if isinstance(selection, SelectedField):
+            yield selection
+        else:
+            # Fragment spreads and inline fragments.
+            yield from flatten_selections(selection.selections)
+
+def get_selections(selections: Iterable, name: str) -> List:
+    return [
+        nested
+        for selection in flatten_selections(selections) if selection.name == name
+        for nested in selection.selections
+    ]
+
+def get_object_definition(type_):
+    while hasattr(type_, "of_type"):
+        type_ = type_.of_type
+    return getattr(type_, "__strawberry_definition__", None)
+
+def collect_paths(selections: Iterable, definition, name_converter, prefix: str = "") -> set:
+    fields = {name_converter.get_graphql_name(field): field for field in definition.fields}
+    paths = set()
+    for selection in flatten_selections(selections):
+        field = fields.get(selection.name)
+        if field is None or "key" not in field.metadata:
+            continue
+
+        path = prefix + field.metadata["key"]
+        nested_definition = get_object_definition(field.type)
+        nested_paths = collect_paths(selection.selections, nested_definition, name_converter, path + ".") if nested_definition else set()
+        paths |= nested_paths or {path}
+    return paths
+
+def build_projection(selections: Iterable, type_: type, info: strawberry.Info) -> dict:
+    """Maps a GraphQL selection set on a raw_field backed type to a Mongo inclusion projection."""
+    paths = collect_paths(selections, type_.__strawberry_definition__, info.schema.config.name_converter)
+    projection = {"_id": 1}
+    # Mongo rejects a projection holding both a path and one of its sub-paths.
+    for path in sorted(paths):
+        if not any(path.startswith(included + ".") for included in projection):
+            projection[path] = 1
+    return projection
@@ -1,8 +1,25 @@
+import base64
 import strawberry
+from bson import ObjectId
 from typing import List, Optional
-from collections import Counter
+from strawberry.extensions import ParserCache, ValidationCache
+from app.config import settings
+from app.graphql.extensions import PersistedQueries, QueryCostLimiter
+from app.graphql.projection import build_projection, get_selections
 from app.graphql.types import Profile
-from app.services.company_profile_service import search_profiles, search_profiles_v2
+from app.services.company_profile_service import aggregate_profiles, profiles_cache, search_profiles, search_profiles_v2
+
+def encode_cursor(id) -> str:
+    return base64.urlsafe_b64encode(str(id).encode()).decode()
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        id = base64.urlsafe_b64decode(cursor.encode()).decode()
+    except ValueError:
+        id = None
+    if not id or not ObjectId.is_valid(id):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return id
 
 @strawberry.type
 class KeyValue:
@@ -19,15 +36,48 @@ class AggregatedData:
     by_project_categories: List[KeyValue]
 
 @strawberry.type
-class SearchProfilesResponse:
-    profiles: List[Profile]
-    aggregates: AggregatedData
+class PageInfo:
+    has_next_page: bool
+    end_cursor: Optional[str]
+
+@strawberry.type
+class ProfileEdge:
+    cursor: str
+    node: Profile
+
+@strawberry.type
+class ProfileConnection:
+    edges: List[ProfileEdge]
+    page_info: PageInfo
+    filters: strawberry.Private[dict]
+
+    @strawberry.field
+    async def aggregates(self) -> AggregatedData:
+        # Computed over every matching profile, not just this page.
+        result = await profiles_cache.get_or_set(
+            {"aggregates": self.filters},
+            lambda: aggregate_profiles(**self.filters)
+        )
+        return AggregatedData(
+            company_count=result["company_count"],
+            reviews_count=result["reviews_count"],
+            by_industries=[KeyValue(**item) for item in result["by_industries"]],
+            by_locations=[KeyValue(**item) for item in result["by_locations"]],
+            by_project_sizes=[KeyValue(**item) for item in result["by_project_sizes"]],
+            by_project_categories=[KeyValue(**item) for item in result["by_project_categories"]]
+        )
+
+@strawberry.type
+class RankedProfile:
+    score: Optional[float]
+    profile: Profile
 
 @strawberry.type
 class Query:
     @strawberry.field
     async def get_profiles(
         self,
+        info: strawberry.Info,
         reviewer_names: Optional[List[str]] = None,
         competitors_focus_names: Optional[List[str]] = None,
         project_focus_names: Optional[List[str]] = None,
@@ -41,67 +91,109 @@ class Query:
         background_client_keywords: Optional[List[str]] = None,
         challenge_client_keywords: Optional[List[str]] = None, 
         solution_client_keywords: Optional[List[str]] = None,
-        feedback_client_keywords: Optional[List[str]] = None
-    ) -> SearchProfilesResponse:
-        result = await search_profiles(
-                    reviewer_names=reviewer_names,
-                    focus_names=competitors_focus_names,
-                    project_focus_names=project_focus_names,
-                    min_reviews=min_reviews,
-                    max_reviews=max_reviews,
-                    include_only_profiles_with_linkedin_url=include_only_profiles_with_linkedin_url,
-                    include_only_profiles_without_linkedin_url=include_only_profiles_without_linkedin_url,
-                    ids=ids,
-                    industry_names=industry_names,
-                    reviewer_titles=reviewer_titles,
-                    background_client_keywords=background_client_keywords,
-                    challenge_client_keywords=challenge_client_keywords,
-                    solution_client_keywords=solution_client_keywords,
-                    feedback_client_keywords=feedback_client_keywords
-                )
-
-        profiles = result
-        reviews_counter = 0
-        industries_counter = Counter()
-        locations_counter = Counter()
-        sizes_counter = Counter()
-        categories_counter = Counter()
-
-        for profile in profiles:
-            if "reviews" in profile and profile["reviews"]:
-                for review in profile["reviews"]:
-                    industry = review.get("reviewer", {}).get("industry")
-                    location = review.get("reviewer", {}).get("location")
-                    size = review.get("project", {}).get("size")
-                    category = review.get("project", {}).get("category")
-                    reviews_counter += 1
-
-                    if industry:
-                        industries_counter[industry] += 1
-                    if location:
-                        country = location.split(",")[-1].strip()
-                        locations_counter[country] += 1
-                    if size:
-                        sizes_counter[size] += 1
-                    if category:
-                        categories_counter[category] += 1
-
-        industry_counts_sorted = sorted(industries_counter.items(), key=lambda x: x[1], reverse=True)
-        location_counts_sorted = sorted(locations_counter.items(), key=lambda x: x[1], reverse=True)
-        project_size_counts_sorted = sorted(sizes_counter.items(), key=lambda x: x[1], reverse=True)
-        categories_counts_sorted = sorted(categories_counter.items(), key=lambda x: x[1], reverse=True)
-
-        return SearchProfilesResponse(
-            profiles=[Profile(**profile) for profile in profiles],
-            aggregates=AggregatedData(
-                reviews_count=reviews_counter,
-                company_count=len(profiles),
-                by_industries=[KeyValue(key=k, value=v) for k, v in industry_counts_sorted],
-                by_locations=[KeyValue(key=k, value=v) for k, v in location_counts_sorted],
-                by_project_sizes=[KeyValue(key=k, value=v) for k, v in project_size_counts_sorted],
-                by_project_categories=[KeyValue(key=k, value=v) for k, v in categories_counts_sorted]
-            )
+        feedback_client_keywords: Optional[List[str]] = None,
+        first: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> ProfileConnection:
+        first = settings.PROFILES_PAGE_SIZE if first is None else first
+        if first < 1 or first > settings.PROFILES_MAX_PAGE_SIZE:
+            raise ValueError(f"first must be between 1 and {settings.PROFILES_MAX_PAGE_SIZE}")
+
+        filters = dict(
+            reviewer_names=reviewer_names,
+            focus_names=competitors_focus_names,
+            project_focus_names=project_focus_names,
+            min_reviews=min_reviews,
+            max_reviews=max_reviews,
+            include_only_profiles_with_linkedin_url=include_only_profiles_with_linkedin_url,
+            include_only_profiles_without_linkedin_url=include_only_profiles_without_linkedin_url,
+            ids=ids,
+            industry_names=industry_names,
+            reviewer_titles=reviewer_titles,
+            background_client_keywords=background_client_keywords,
+            challenge_client_keywords=challenge_client_keywords,
+            solution_client_keywords=solution_client_keywords,
+            feedback_client_keywords=feedback_client_keywords
+        )
+
+        # Only the fields selected under edges.node are read from Mongo.
+        node_selections = get_selections(get_selections(info.selected_fields[0].selections, "edges"), "node")
+
+        projection = build_projection(node_selections, Profile, info)
+        after = decode_cursor(after) if after else None
+
+        # One extra profile tells whether there is a next page.
+        profiles = await profiles_cache.get_or_set(
+            {"profiles": filters, "projection": projection, "after": after, "limit": first + 1},
+            lambda: search_profiles(**filters, projection=projection, after=after, limit=first + 1)
+        )
+        has_next_page = len(profiles) > first
+        edges = [ProfileEdge(cursor=encode_cursor(profile["_id"]), node=Profile(raw=profile)) for profile in profiles[:first]]
+
+        return ProfileConnection(
+            edges=edges,
+            page_info=PageInfo(
+                has_next_page=has_next_page,
+                end_cursor=edges[-1].cursor if edges else None
+            ),
+            filters=filters
+        )
+
+    @strawberry.field
+    async def search_profiles(
+        self,
+        info: strawberry.Info,
+        reviewer_names: Optional[List[str]] = None,
+        competitors_focus_names: Optional[List[str]] = None,
+        project_focus_names: Optional[List[str]] = None,
+        min_reviews: Optional[int] = None,
+        max_reviews: Optional[int] = None,
+        include_only_profiles_without_linkedin_url: Optional[bool] = False,
+        include_only_profiles_with_linkedin_url: Optional[bool] = False,
+        ids: Optional[List[str]] = None,
+        industry_names: Optional[List[str]] = None,
+        reviewer_titles: Optional[List[str]] = None,
+        background_client_keywords: Optional[List[str]] = None,
+        challenge_client_keywords: Optional[List[str]] = None,
+        solution_client_keywords: Optional[List[str]] = None,
+        feedback_client_keywords: Optional[List[str]] = None,
+        top: Optional[int] = None
+    ) -> List[RankedProfile]:
+        top = settings.PROFILES_SEARCH_TOP_K if top is None else top
+        if top < 1 or top > settings.PROFILES_MAX_PAGE_SIZE:
+            raise ValueError(f"top must be between 1 and {settings.PROFILES_MAX_PAGE_SIZE}")
+
+        filters = dict(
+            reviewer_names=reviewer_names,
+            focus_names=competitors_focus_names,
+            project_focus_names=project_focus_names,
+            min_reviews=min_reviews,
+            max_reviews=max_reviews,
+            include_only_profiles_with_linkedin_url=include_only_profiles_with_linkedin_url,
+            include_only_profiles_without_linkedin_url=include_only_profiles_without_linkedin_url,
+            ids=ids,
+            industry_names=industry_names,
+            reviewer_titles=reviewer_titles,
+            background_client_keywords=background_client_keywords,
+            challenge_client_keywords=challenge_client_keywords,
+            solution_client_keywords=solution_client_keywords,
+            feedback_client_keywords=feedback_client_keywords
+        )
+        projection = build_projection(get_selections(info.selected_fields[0].selections, "profile"), Profile, info)
+
+        profiles = await profiles_cache.get_or_set(
+            {"ranked": filters, "projection": projection, "top": top},
+            lambda: search_profiles_v2(**filters, top_k=top, projection=projection)
         )
+        return [RankedProfile(score=profile.get("score"), profile=Profile(raw=profile)) for profile in profiles]
 
-schema = strawberry.Schema(query=Query)
+schema = strawberry.Schema(
+    query=Query,
+    extensions=[
+        PersistedQueries,
+        lambda: ParserCache(maxsize=settings.GRAPHQL_DOCUMENT_CACHE_SIZE),
+        lambda: ValidationCache(maxsize=settings.GRAPHQL_DOCUMENT_CACHE_SIZE),
+        QueryCostLimiter
+    ]
+)
 
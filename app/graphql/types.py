@@ -1,6 +1,24 @@
 import strawberry
 from typing import List, Optional
 
+def raw_field(key: str, type_: Optional[type] = None, many: bool = False):
+    """Resolves a field from the raw Mongo document only when it is selected.
+
+    Nested types wrap the raw sub-document, so unselected subtrees are never allocated.
+    The key is kept in the field metadata to build Mongo projections from selection sets.
+    """
+    def resolver(root):
+        value = root.raw.get(key)
+        if type_ is None:
+            return value
+        if not value:
+            return None
+        if many:
+            return [type_(raw=item) for item in value]
+        return type_(raw=value)
+
+    return strawberry.field(resolver=resolver, metadata={"key": key})
+
 @strawberry.type
 class Address:
     street: Optional[str]
@@ -12,94 +30,75 @@ class Address:
 
 @strawberry.type
 class Reviewer:
-    title: Optional[str]
-    name: Optional[str]
-    industry: Optional[str]
-    size: Optional[str]
-    location: Optional[str]
-    reviewType: Optional[str]
-    isVerified: Optional[bool]
-    linkedinUrl: Optional[str]
+    raw: strawberry.Private[dict]
+    title: Optional[str] = raw_field("title")
+    name: Optional[str] = raw_field("name")
+    industry: Optional[str] = raw_field("industry")
+    size: Optional[str] = raw_field("size")
+    location: Optional[str] = raw_field("location")
+    reviewType: Optional[str] = raw_field("reviewType")
+    isVerified: Optional[bool] = raw_field("isVerified")
+    linkedinUrl: Optional[str] = raw_field("linkedinUrl")
 
 @strawberry.type
 class Project:
-    name: str
-    category: Optional[str]
-    allCategories: Optional[List[str]]
-    size: Optional[str]
-    length: Optional[str]
-    description: Optional[str]
+    raw: strawberry.Private[dict]
+    name: str = raw_field("name")
+    category: Optional[str] = raw_field("category")
+    allCategories: Optional[List[str]] = raw_field("allCategories")
+    size: Optional[str] = raw_field("size")
+    length: Optional[str] = raw_field("length")
+    description: Optional[str] = raw_field("description")
 
 @strawberry.type
 class Content:
-    label: str
-    text: str
+    raw: strawberry.Private[dict]
+    label: str = raw_field("label")
+    text: str = raw_field("text")
 
 @strawberry.type
 class ReviewDetails:
-    rating: Optional[int]
-    quality: Optional[int]
-    schedule: Optional[int]
-    cost: Optional[int]
-    willingToRefer: Optional[int]
-    comments: Optional[str]
+    raw: strawberry.Private[dict]
+    rating: Optional[int] = raw_field("rating")
+    quality: Optional[int] = raw_field("quality")
+    schedule: Optional[int] = raw_field("schedule")
+    cost: Optional[int] = raw_field("cost")
+    willingToRefer: Optional[int] = raw_field("willingToRefer")
+    comments: Optional[str] = raw_field("comments")
 
 @strawberry.type
 class Review:
-    name: str
-    datePublished: Optional[str]
-    project: Optional[Project]
-    reviewer: Optional[Reviewer]
-    review: Optional[ReviewDetails]
-    content: Optional[List[Content]]
+    raw: strawberry.Private[dict]
+    name: str = raw_field("name")
+    datePublished: Optional[str] = raw_field("datePublished")
+    project: Optional[Project] = raw_field("project", Project)
+    reviewer: Optional[Reviewer] = raw_field("reviewer", Reviewer)
+    review: Optional[ReviewDetails] = raw_field("review", ReviewDetails)
+    content: Optional[List[Content]] = raw_field("content", Content, many=True)
 
 @strawberry.type
 class Summary:
-    name: str
-    rating: Optional[float]
-    noOfReviews: Optional[int]
-    description: Optional[str]
-    minProjectSize: Optional[str]
-    averageHourlyRate: Optional[str]
-    employees: Optional[str]
+    raw: strawberry.Private[dict]
+    name: str = raw_field("name")
+    rating: Optional[float] = raw_field("rating")
+    noOfReviews: Optional[int] = raw_field("noOfReviews")
+    description: Optional[str] = raw_field("description")
+    minProjectSize: Optional[str] = raw_field("minProjectSize")
+    averageHourlyRate: Optional[str] = raw_field("averageHourlyRate")
+    employees: Optional[str] = raw_field("employees")
 
 @strawberry.type
 class Service:
-    name: str
-    percent: float
+    raw: strawberry.Private[dict]
+    name: str = raw_field("name")
+    percent: float = raw_field("percent")
 
 @strawberry.type
 class Profile:
-    _id: str
-    url: Optional[str]
-    servicesProvided: Optional[List[Service]]
-    summary: Optional[Summary]
-    focus: Optional[List[str]]
-    reviews: Optional[List[Review]]
-
-    def __init__(self, _id, url=None, servicesProvided=None, summary=None, focus=None, reviews=None, **kwargs):
-        self._id = _id
-        self.url = url
-        self.servicesProvided = [Service(
-            name=service.get("name"),
-            percent=service.get("percent")
-        ) for service in servicesProvided] if servicesProvided else None
-        self.summary = Summary(**summary) if summary else None
-        self.focus = focus
-        self.reviews = [Review(
-            name=review.get("name"),
-            datePublished=review.get("datePublished"),
-            project=Project(**review["project"]) if review.get("project") else None,
-            reviewer=Reviewer(
-                    title=review["reviewer"].get("title"),
-                    name=review["reviewer"].get("name"),
-                    industry=review["reviewer"].get("industry"),
-                    size=review["reviewer"].get("size"),
-                    location=review["reviewer"].get("location"),
-                    reviewType=review["reviewer"].get("reviewType"),
-                    isVerified=review["reviewer"].get("isVerified"),
-                    linkedinUrl=review["reviewer"].get("linkedinUrl")  # Ensure this is explicitly handled
-                ) if review.get("reviewer") else None,
-            review=ReviewDetails(**review["review"]) if review.get("review") else None,
-            content=[Content(**content) for content in review["content"]] if review.get("content") else None
-        ) for review in reviews] if reviews else None
+    raw: strawberry.Private[dict]
+    _id: str = raw_field("_id")
+    url: Optional[str] = raw_field("url")
+    servicesProvided: Optional[List[Service]] = raw_field("servicesProvided", Service, many=True)
+    summary: Optional[Summary] = raw_field("summary", Summary)
+    focus: Optional[List[str]] = raw_field("focus")
+    reviews: Optional[List[Review]] = raw_field("reviews", Review, many=True)
@@ -0,0 +1,116 @@
+import asyncio
+import re
+import sys
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+from app.db import database
+from app.utils.keyword_index import KEYWORD_TERMS_FIELD
+
+COMPANY_PROFILE_INDEXES = [
+    IndexModel([("url", ASCENDING)], name="url_unique", unique=True),
+    IndexModel([("summary.noOfReviews", ASCENDING)], name="summary_no_of_reviews"),
+    IndexModel([("reviews.reviewer.linkedinUrl", ASCENDING)], name="reviews_reviewer_linkedin_url"),
+    IndexModel([(f"reviews.{KEYWORD_TERMS_FIELD}", ASCENDING)], name="review_keyword_terms"),
+    IndexModel(
+        [("focus", TEXT), ("summary.name", TEXT), ("summary.description", TEXT), ("reviews.content.text", TEXT)],
+        weights={"focus": 10, "summary.name": 5, "summary.description": 3, "reviews.content.text": 1},
+        name="profile_text"
+    )
+]
+
+INDEXES = {
+    "company_profiles": COMPANY_PROFILE_INDEXES,
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True)
+    ],
+    "user_requests": [
+        IndexModel([("email", ASCENDING), ("createdAt", DESCENDING)], name="email_created_at"),
+        IndexModel([("createdAt", DESCENDING)], name="created_at")
+    ],
+    "user_usage_rollups": [
+        IndexModel(
+            [("email", ASCENDING), ("granularity", ASCENDING), ("bucketStart", ASCENDING), ("request_type", ASCENDING)],
+            name="email_granularity_bucket_start_request_type_unique",
+            unique=True
+        )
+    ]
+}
+
+# Query shapes of the hot paths, checked by the coverage report.
+HOT_QUERIES = [
+    {"name": "auth and quota user lookup", "collection": "users", "filter": {"email": "user@example.com"}},
+    {"name": "ingest upsert by url", "collection": "company_profiles", "filter": {"url": "https://clutch.co/profile/example"}},
+    {"name": "profiles page", "collection": "company_profiles", "filter": {}, "sort": {"_id": 1}, "limit": 50},
+    {"name": "profiles by review count", "collection": "company_profiles", "filter": {"summary.noOfReviews": {"$gte": 5, "$lte": 20}}},
+    {"name": "profiles with linkedin urls", "collection": "company_profiles", "filter": {"reviews.reviewer.linkedinUrl": {"$exists": True, "$ne": ""}}},
+    {"name": "review keyword terms", "collection": "company_profiles", "filter": {f"reviews.{KEYWORD_TERMS_FIELD}": re.compile("^background:marketing")}},
+    {"name": "ranked text search", "collection": "company_profiles", "filter": {"$text": {"$search": "web scraping"}}},
+    {"name": "user requests by user", "collection": "user_requests", "filter": {"email": "user@example.com"}, "sort": {"createdAt": -1}},
+    {"name": "user requests by time", "collection": "user_requests", "filter": {"createdAt": {"$gte": 0}}},
+    {"name": "usage history", "collection": "user_usage_rollups", "filter": {"email": "user@example.com", "granularity": "day", "bucketStart": {"$gte": 0}}, "sort": {"bucketStart": 1}}
+]
+
+async def ensure_collection_indexes(collection, indexes: list) -> dict:
+    """Creates the missing indexes one by one, so one conflicting definition does not block the others."""
+    result = {"created": [], "existing": [], "failed": []}
+    existing = await collection.index_information()
+    for index in indexes:
+        name = index.document["name"]
+        if name in existing:
+            result["existing"].append(name)
+            continue
+        try:
+            await collection.create_indexes([index])
+            result["created"].append(name)
+        except OperationFailure as e:
+            result["failed"].append(name)
+            print(f"Index {name} can not be created on {collection.name}: {e}")
+    return result
+
+async def ensure_indexes(db=database, indexes: dict = INDEXES) -> dict:
+    return {name: await ensure_collection_indexes(db[name], collection_indexes) for name, collection_indexes in indexes.items()}
+
+def get_plan_stages(plan: dict) -> list:
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += get_plan_stages(plan[key])
+    for input_plan in plan.get("inputStages", []):
+        stages += get_plan_stages(input_plan)
+    return [stage for stage in stages if stage]
+
+async def explain_query(db, query: dict) -> dict:
+    command = {"find": query["collection"], "filter": query["filter"]}
+    for key in ("sort", "limit"):
+        if key in query:
+            command[key] = query[key]
+    try:
+        explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+    except OperationFailure as e:
+        return {"name": query["name"], "collection": query["collection"], "covered": False, "stages": [], "error": str(e)}
+
+    stages = get_plan_stages(explain["queryPlanner"]["winningPlan"])
+    return {
+        "name": query["name"],
+        "collection": query["collection"],
+        "covered": "COLLSCAN" not in stages and "SORT" not in stages,
+        "stages": stages
+    }
+
+async def report_index_coverage(db=database, hot_queries: list = HOT_QUERIES) -> list:
+    """Explains every hot query and flags the ones planned as a collection scan or an in-memory sort."""
+    return [await explain_query(db, query) for query in hot_queries]
+
+async def main(command: str):
+    if command == "ensure":
+        for collection, result in (await ensure_indexes()).items():
+            print(f"{collection}: created {result['created']}, existing {result['existing']}, failed {result['failed']}")
+    elif command == "report":
+        for result in await report_index_coverage():
+            status = "ok" if result["covered"] else "NOT COVERED"
+            print(f"{status:>11}  {result['collection']}: {result['name']} -> {' <- '.join(result['stages']) or result.get('error')}")
+    else:
+        print("Usage: python -m app.indexes [ensure|report]")
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "ensure"))
@@ -4,11 +4,61 @@ from app.graphql.schema import schema
 from app.api.background_api import router as background_api_router
 from app.api.chat_api import router as chat_api_router
 from app.api.user_api import router as user_api_router
+from app.api.metrics_api import router as metrics_api_router
+from app.api.health_api import router as health_api_router
+from app.services.user_service import run_quota_lease_flusher, flush_quota_leases, user_request_log_sink
+from app.services.company_profile_service import profiles_cache, watch_company_profile_changes
+from app.services.popular_query_service import run_popular_queries_job
+from app.indexes import ensure_indexes
+from app.clients import warm_up_clients, close_clients
+from app.warmup import run_warm_up, mark_ready
+from app.config import settings
+from contextlib import asynccontextmanager
+import asyncio
 
-app = FastAPI()
+background_tasks = set()
+
+async def startup():
+    if settings.CLIENTS_WARM_UP_ENABLED:
+        warm_up_clients()
+    await ensure_indexes()
+    background_tasks.add(asyncio.create_task(run_quota_lease_flusher()))
+    user_request_log_sink.start()
+    profiles_cache.start()
+    if settings.PROFILES_CACHE_CHANGE_STREAM_ENABLED:
+        background_tasks.add(asyncio.create_task(watch_company_profile_changes()))
+    if settings.POPULAR_QUERIES_JOB_ENABLED:
+        background_tasks.add(asyncio.create_task(run_popular_queries_job()))
+    # The worker serves right away; /api/ready/ turns healthy once warm-up is done.
+    if settings.WARM_UP_ENABLED:
+        background_tasks.add(asyncio.create_task(run_warm_up()))
+    else:
+        mark_ready()
+
+async def shutdown():
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    await flush_quota_leases(force=True)
+    await user_request_log_sink.close()
+    await profiles_cache.close()
+    await close_clients()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Owns the upstream clients and background tasks; tests override app.clients before entering it."""
+    await startup()
+    try:
+        yield
+    finally:
+        await shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 graphql_app = GraphQLRouter(schema)
 app.include_router(graphql_app, prefix="/graphql")
 app.include_router(background_api_router, prefix="/api")
 app.include_router(chat_api_router, prefix="/api")
-app.include_router(user_api_router, prefix="/api")
\ No newline at end of file
+app.include_router(user_api_router, prefix="/api")
+app.include_router(metrics_api_router, prefix="/api")
+app.include_router(health_api_router, prefix="/api")
\ No newline at end of file
@@ -1,59 +1,350 @@
 from app.config import settings
 import asyncio
-from typing import List
-from azure.search.documents import SearchClient
-from azure.search.documents.models import QueryType, QueryCaptionType, QueryAnswerType
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents.models import VectorizedQuery
-from openai import OpenAI, AzureOpenAI
+from typing import List, Optional
+from app.clients import embedding_client, search_client, completion_client
+from app.utils import metrics
+from app.utils.upstream import UpstreamScheduler, estimate_tokens
+from app.utils.deadline import Deadline
+from app.utils.extractive import extract_review
+from app.utils.minhash import collapse_duplicates, review_text
 import re
+import time
+from array import array
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
+
+upstream_scheduler = UpstreamScheduler(
+    limits=settings.UPSTREAM_LIMITS,
+    max_retries=settings.UPSTREAM_MAX_RETRIES,
+    backoff_base_ms=settings.UPSTREAM_BACKOFF_BASE_MS,
+    backoff_max_ms=settings.UPSTREAM_BACKOFF_MAX_MS,
+    concurrency=settings.UPSTREAM_CONCURRENCY,
+    min_concurrency=settings.UPSTREAM_MIN_CONCURRENCY,
+    max_concurrency=settings.UPSTREAM_MAX_CONCURRENCY
+)
+
+BACKGROUND_QUESTIONS = (
+    r"Please describe your company and your position there.",
+    r"Introduce your business and what you do there.",
+    r"Please describe your company and position.",
+    r"Please briefly describe what your company does.",
+    f"Please describe your organization.",
+    f"Describe what your company does in a single sentence."
+)
 
-embedding_client = AzureOpenAI(
-    api_version=settings.EMBEDDING_API_VERSION,
-    api_key=settings.EMBEDDING_KEY,
-    azure_endpoint=settings.EMBEDDING_ENDPOINT
+SOLUTION_QUESTIONS = (
+    r"How did you select * and what were the deciding factors?",
+    r"Describe the scope of work in detail, including the project steps, key deliverables, and technologies used.",
+    r"What was the scope of their involvement?",
+    r"How did you find *?",
+    r"How did you select *?",
+    r"How did you select this *?",
+    r"How did you come to work with *?"
+    r"How many people from *'s team worked with you, and what were their positions?",
+    r"What is the team composition?",
+    r"What was the team composition?",
+    r"How did you come to work with *?",
+    r"How much have you invested with them?",
+    r"What is the status of this engagement?",
+    r"Why did you select *?",
+    r"Could you provide a sense of the size of this initiative in financial terms?",
+    r"How many teammates from *?",
+    r"Describe the scope of work in detail. Please include a summary of key deliverables.",
+    r"How many resources from *?",
+    r"Describe the project and the services they provided in detail.",
+    r"Please describe the scope of their work.",
+    r"What was your process in selecting *?"
+    r"Can you provide a ballpark figure for the size of the work that *?",
+    r"What's the status of this engagement?"
 )
 
-search_client = SearchClient(
-    endpoint=settings.SEARCH_ENDPOINT,
-    index_name=settings.SEARCH_INDEX_NAME,
-    credential=AzureKeyCredential(settings.SEARCH_API_KEY)
+CHALLENGE_QUESTIONS = (
+    r"For what projects/services did your company hire *, and what were your goals?",
+    r"What specific goals or objectives did you hire *?",
+    r"What challenge were you trying to address with *?",
+    r"For what projects/services did your company hire *?",
+    r"What was the business challenge that you were trying to address when you approached *?",
+    r"What business challenge were you trying to address with *?",
+    r"What was your goal in working with *?",
+    r"What were your goals for this project?",
+    r"What specific goals or objectives did you hire *",
+    r"What specific goals or objectives did you hire * to accomplish?",
+    r"What challenge were you addressing when you hired *?"
 )
 
-#completion_client = AzureOpenAI(
-#    api_version=settings.COMPLETION_API_VERSION,
-#    azure_endpoint=settings.AZURE_COMPLETION_ENDPOINT,
-#    api_key=settings.AZURE_OPENAI_KEY
-#)
+FEEDBACK_QUESTIONS = (
+    r"What evidence can you share that demonstrates the impact of the engagement?",
+    r"Are there any areas they could improve?",
+    r"What did you find most impressive about them?",
+    r"Can you share any outcomes from the project that demonstrate progress or success?",
+    r"How effective was the workflow between your team and theirs?",
+    r"What did you find most impressive or unique about this company?",
+    r"Can you share any information that demonstrates the impact that this project has had on your business?",
+    r"Could you share any evidence that would demonstrate the productivity, quality of work, or the impact of the engagement?",
+    r"Can you share any measurable outcomes of the project or general feedback about the deliverables?",
+    r"Describe their project management style, including communication tools and timeliness.",
+    r"Are there any areas for improvement or something they could have done differently?",
+    r"What were the measurable outcomes from the project that demonstrate progress or success?",
+    r"Did they deliver items on time?",
+    r"How did they respond to your needs?",
+    r"What was your primary form of communication with *?",
+    r"How satisfied are you with the work of *?",
+    r"Is there anything unique about *?",
+    r"Looking back on the work so far, is there any area that you think they could improve upon or something that you might do differently?",
+    r"What advice would you give a future client of theirs?",
+    r"Describe their project management",
+    r"How was project management arranged and how effective was it\?",
+    r"What stood out to you about their communication or project delivery\?",
+    r"What made you happiest working with \*?",
+    r"What aspect of their performance did you appreciate the most\?",
+    r"What impressed you most about \*?",
+    r"What improvements would you suggest for \*?",
+    r"What’s one thing \* could do better\?",
+    r"What has been the greatest result of the work done by \*?",
+    r"What has your experience been like collaborating with the team at \*?",
+    r"Do you have any advice for potential customers?",
+    r"What kind of impact did this project have on your company?",
+    r"What could have been done differently on this project?",
+    r"What sets \* apart from other vendors you’ve worked with?",
+    r"Are there any areas for improvement",
+    r"Do you have any advice for potential customers\?",
+    r"How was project management arranged and how effective was it\?",
+    r"How did your relationship with your partner evolve\?",
+    r"What advice do you have for clients with similar needs to yours\?",
+    r"In what ways can they improve\?"
+)
+
+REVIEW_QUESTIONS = {
+    "content_background": BACKGROUND_QUESTIONS,
+    "content_solution": SOLUTION_QUESTIONS,
+    "content_opportunity_challenge": CHALLENGE_QUESTIONS,
+    "content_results_feedback": FEEDBACK_QUESTIONS
+}
+
+class EmbeddingDispatcher:
+    """Collects concurrent query embeddings into one batched embeddings.create call.
+
+    Callers await embed() and get their own vector back. A batch is sent when it
+    reaches max_batch_size or when the oldest pending query has waited max_wait_ms.
+    The last cache_size distinct query vectors are kept and served without a call, as
+    float32 arrays: 4 bytes per dimension, about 12MB for 1000 vectors of 3072 dimensions
+    instead of about 100MB as lists of floats.
+    """
 
-completion_client = OpenAI(
-    api_key=settings.AZURE_OPENAI_KEY
+    def __init__(self, client, model: str, max_batch_size: int = 16, max_wait_ms: int = 5, cache_size: int = 0):
+        self.client = client
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self.cache_size = max(0, cache_size)
+        self._cache = OrderedDict()
+        self._pending = []
+        self._flush_handle = None
+        self._tasks = set()
+
+    async def embed(self, text: str) -> List[float]:
+        vector = self._cache.get(text)
+        if vector is not None:
+            self._cache.move_to_end(text)
+            metrics.increment("embedding_cache_hits_total")
+            return vector.tolist()
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        metrics.increment("embedding_requests_total")
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = asyncio.ensure_future(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch):
+        batch = [item for item in batch if not item[1].done()]
+        if not batch:
+            return
+
+        dispatched_at = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            metrics.observe("embedding_batch_wait_ms", (dispatched_at - enqueued_at) * 1000)
+        metrics.observe("embedding_batch_size", len(batch), metrics.SIZE_BUCKETS)
+        metrics.increment("embedding_upstream_calls_total")
+
+        # Identical queries in the same window share one input slot.
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+
+        try:
+            response = await upstream_scheduler.run(
+                self.model,
+                self.client.embeddings.create,
+                input=texts,
+                model=self.model,
+                tokens=estimate_tokens(*texts)
+            )
+        except Exception as e:
+            metrics.increment("embedding_upstream_errors_total")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        metrics.observe("embedding_upstream_latency_ms", (time.perf_counter() - dispatched_at) * 1000)
+        vectors = {texts[item.index]: item.embedding for item in response.data}
+        for text, vector in vectors.items():
+            self._remember(text, vector)
+        for text, future, _ in batch:
+            if not future.done():
+                future.set_result(vectors[text])
+
+        calls = metrics.get_counter("embedding_upstream_calls_total")
+        if calls:
+            metrics.set_gauge("embedding_batch_throughput_gain", metrics.get_counter("embedding_requests_total") / calls)
+
+    def _remember(self, text: str, vector: List[float]):
+        if not self.cache_size:
+            return
+        self._cache[text] = array("f", vector)
+        self._cache.move_to_end(text)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+embedding_dispatcher = EmbeddingDispatcher(
+    embedding_client,
+    settings.EMBEDDING_MODEL_NAME,
+    max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+    max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+    cache_size=settings.EMBEDDING_CACHE_MAX_ENTRIES
 )
 
-async def analyze(query: str, review_date_from: str, industries: List[str], company_sizes: list, project_budgets: list):
-    embedding = embedding_client.embeddings.create(input=query, model=settings.EMBEDDING_MODEL_NAME).data[0].embedding
+async def analyze(query: str, review_date_from: str, industries: List[str], company_sizes: list, project_budgets: list, deadline_ms: Optional[int] = None, mode: str = "llm"):
+    progress = {"map_tasks": None, "reduce_done": False}
+    try:
+        return await run_analyze(query, review_date_from, industries, company_sizes, project_budgets, deadline_ms, mode, progress)
+    except asyncio.CancelledError:
+        record_cancelled_analyze(mode, progress)
+        raise
+
+def record_cancelled_analyze(mode: str, progress: dict):
+    map_tasks = progress["map_tasks"]
+    if map_tasks is None:
+        completions_avoided = 3 if mode == "llm" else 0
+    else:
+        completions_avoided = sum(1 for task in map_tasks if not task.done())
+        for task in map_tasks:
+            task.cancel()
+    if not progress["reduce_done"]:
+        completions_avoided += 1
+
+    # Upper-bound estimate: completions cancelled mid-flight are counted as fully saved.
+    llm_ms_saved = completions_avoided * metrics.get_histogram_avg(f"upstream_latency_ms:{settings.COMPLETION_MODEL_NAME}")
+    metrics.increment("analyze_cancelled_total")
+    metrics.increment("analyze_cancelled_completions_avoided_total", completions_avoided)
+    metrics.increment("analyze_cancelled_llm_ms_saved_total", llm_ms_saved)
+
+async def run_analyze(query: str, review_date_from: str, industries: List[str], company_sizes: list, project_budgets: list, deadline_ms: Optional[int], mode: str, progress: dict):
+    deadline = Deadline(deadline_ms)
+    degradations = []
+
+    top = 25
+    if deadline.enabled and deadline_ms < settings.ANALYZE_REDUCED_RETRIEVAL_BELOW_MS:
+        top = settings.ANALYZE_REDUCED_RETRIEVAL_TOP
+        degradations.append("reduced_retrieval")
+
+    reviews = await deadline.run(retrieve_reviews(query, review_date_from, industries, company_sizes, project_budgets, top))
+
+    if mode == "extractive":
+        intermediate_insights = [format_reviews_text(
+            extract_review(review, query, settings.ANALYZE_EXTRACTIVE_SENTENCES, get_prompt_regexes()) for review in reviews
+        )]
+    elif deadline.remaining(settings.ANALYZE_REDUCE_RESERVE_MS) * 1000 < settings.ANALYZE_MIN_MAP_BUDGET_MS:
+        intermediate_insights = []
+    else:
+        review_chunks = chunk_list(reviews, 3)
+        map_tasks = [asyncio.ensure_future(get_analysis_internal(chunk)) for chunk in review_chunks]
+        progress["map_tasks"] = map_tasks
+        done, pending = await asyncio.wait(map_tasks, timeout=deadline.timeout(settings.ANALYZE_REDUCE_RESERVE_MS))
+        for task in pending:
+            task.cancel()
+        if pending:
+            degradations.append("dropped_map_chunks")
+        intermediate_insights = [task.result() for task in map_tasks if task in done]
+
+    if intermediate_insights:
+        insights_combined = "\n\n".join(intermediate_insights)
+    else:
+        degradations.append("skipped_map_stage")
+        insights_combined = format_reviews_text(reviews)
+
+    final_prompt = f"""
+    You are an expert in customer feedback analysis specializing in IT services and solutions.
+    The user has the following query: "{query}"
+    
+    Use only the structured review summaries provided below to generate the final analysis:
+    
+    {insights_combined}
+    
+    Provide a comprehensive and structured summary, ensuring insights remain objective and data-driven.
+    """
+
+    try:
+        final_response = await deadline.run(run_completion(final_prompt))
+        progress["reduce_done"] = True
+        result = final_response.choices[0].message.content
+    except asyncio.TimeoutError:
+        degradations.append("reduce_timeout")
+        result = insights_combined
+
+    for degradation in degradations:
+        metrics.increment(f"analyze_degradations_total:{degradation}")
+
+    return result, degradations
+
+async def retrieve_reviews(query: str, review_date_from: str, industries: List[str], company_sizes: list, project_budgets: list, top: int = 25):
+    from azure.search.documents.models import QueryType, QueryCaptionType, QueryAnswerType, VectorizedQuery
+    embedding = await embedding_dispatcher.embed(query)
     
     vector_query = VectorizedQuery(vector=embedding, k_nearest_neighbors=50, fields="embeddings")
 
     filter_query = build_search_filter(review_date_from, industries, company_sizes, project_budgets)
 
-    results = search_client.search(
+    results = await run_search(
         search_text=query,
         vector_queries=[vector_query],
         filter=filter_query,
         select=[
             "project_name", "reviewer_industry", "content_background",
             "content_opportunity_challenge", "content_solution", "content_results_feedback"
-        ],
-        top=25,
+        ] + get_signature_fields(),
+        top=top,
         query_type=QueryType.SEMANTIC,
         semantic_configuration_name='semantic-configuration',
         query_caption=QueryCaptionType.EXTRACTIVE,
         query_answer=QueryAnswerType.EXTRACTIVE
     )
 
-    reviews = [
+    results, duplicates = collapse_review_duplicates(results)
+    if settings.REVIEW_DEDUPE_ENABLED:
+        tokens_saved = sum(estimate_tokens(review_text(r)) for r in duplicates)
+        metrics.observe("analyze_dedupe_collapsed_reviews", len(duplicates), metrics.SIZE_BUCKETS)
+        metrics.observe("analyze_dedupe_tokens_saved", tokens_saved, metrics.TOKEN_BUCKETS)
+        metrics.increment("analyze_dedupe_tokens_saved_total", tokens_saved)
+
+    return [
         {
             "project_name": r.get("project_name", ""),
             "reviewer_industry": r.get("reviewer_industry", ""),
@@ -65,36 +356,8 @@ async def analyze(query: str, review_date_from: str, industries: List[str], comp
         for r in results
     ]
 
-    review_chunks = chunk_list(reviews, 3)
-
-    intermediate_insights = await asyncio.gather(*(get_analysis_internal(chunk) for chunk in review_chunks))
-
-    insights_combined = "\n\n".join(intermediate_insights)
-
-    final_prompt = f"""
-    You are an expert in customer feedback analysis specializing in IT services and solutions.
-    The user has the following query: "{query}"
-    
-    Use only the structured review summaries provided below to generate the final analysis:
-    
-    {insights_combined}
-    
-    Provide a comprehensive and structured summary, ensuring insights remain objective and data-driven.
-    """
-
-    final_response = completion_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are an expert in customer feedback analysis."},
-            {"role": "user", "content": final_prompt}
-        ],
-        temperature=0
-    )
-
-    return final_response.choices[0].message.content
-
-async def get_analysis_internal(reviews):
-    reviews_text = "\n\n".join(
+def format_reviews_text(reviews) -> str:
+    return "\n\n".join(
         f"Industry: {r['reviewer_industry']}\n"
         f"Background summary: {r['content_background']}\n"
         f"Challenge/Pain summary: {r['content_opportunity_challenge']}\n"
@@ -103,6 +366,9 @@ async def get_analysis_internal(reviews):
         for r in reviews
     )
 
+async def get_analysis_internal(reviews):
+    reviews_text = format_reviews_text(reviews)
+
     prompt = f"""
     You are an expert in customer feedback analysis specializing in IT services and solutions.
     Here are multiple customer reviews:
@@ -119,24 +385,52 @@ async def get_analysis_internal(reviews):
     Keep the summaries concise and extract only the most valuable insights.
     """
 
-    response = completion_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are an expert in customer feedback analysis."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0
-    )
+    response = await run_completion(prompt)
 
     return response.choices[0].message.content
 
+async def run_completion(prompt: str):
+    messages = [
+        {"role": "system", "content": "You are an expert in customer feedback analysis."},
+        {"role": "user", "content": prompt}
+    ]
+
+    # The async client lets a cancelled request abort its in-flight completion.
+    async def create_completion():
+        return await completion_client.chat.completions.create(
+            model=settings.COMPLETION_MODEL_NAME,
+            messages=messages,
+            temperature=0
+        )
+
+    response = await upstream_scheduler.run(
+        settings.COMPLETION_MODEL_NAME,
+        create_completion,
+        tokens=estimate_tokens(*(message["content"] for message in messages))
+    )
+
+    usage = getattr(response, "usage", None)
+    if usage:
+        metrics.increment("completion_prompt_tokens_total", usage.prompt_tokens)
+        metrics.increment("completion_output_tokens_total", usage.completion_tokens)
+
+    return response
+
+async def run_search(**kwargs):
+    # SearchClient.search is lazy, so the results are materialised inside the scheduled call.
+    return await upstream_scheduler.run(
+        "azure-search",
+        lambda: list(search_client.search(**kwargs))
+    )
+
 async def search(query: str, review_date_from: str, industries: list, company_sizes: list, project_budgets: list, limit: int):
-    embedding = embedding_client.embeddings.create(input=query, model=settings.EMBEDDING_MODEL_NAME).data[0].embedding
+    from azure.search.documents.models import QueryType, QueryCaptionType, QueryAnswerType, VectorizedQuery
+    embedding = await embedding_dispatcher.embed(query)
     vector_query = VectorizedQuery(vector=embedding, k_nearest_neighbors=50, fields="embeddings")
         
     filter_query = build_search_filter(review_date_from, industries, company_sizes, project_budgets)
         
-    results = search_client.search(
+    results = await run_search(
         search_text=query,
         vector_queries=[vector_query],
         filter=filter_query,
@@ -156,7 +450,7 @@ async def search(query: str, review_date_from: str, industries: list, company_si
             "content_solution",
             "content_results_feedback",
             "reviewer_position"
-        ],
+        ] + get_signature_fields(),
         top=limit,
         query_type=QueryType.SEMANTIC,
         semantic_configuration_name='semantic-configuration',
@@ -164,6 +458,10 @@ async def search(query: str, review_date_from: str, industries: list, company_si
         query_answer=QueryAnswerType.EXTRACTIVE
     )
 
+    results, duplicates = collapse_review_duplicates(results)
+    if settings.REVIEW_DEDUPE_ENABLED:
+        metrics.observe("search_dedupe_collapsed_reviews", len(duplicates), metrics.SIZE_BUCKETS)
+
     final_results = []
     for result in results:
         formatted_result = {
@@ -179,99 +477,29 @@ async def search(query: str, review_date_from: str, industries: list, company_si
             ).strftime("%B, %Y"),
             "Project Tags": [tag.lower() for tag in result["tags"]],
             "Vendor Name": result["company_name"],
-            "Background": extract_qna(result["content_background"], [
-                r"Please describe your company and your position there.",
-                r"Introduce your business and what you do there.",
-                r"Please describe your company and position.",
-                r"Please briefly describe what your company does.",
-                f"Please describe your organization.",
-                f"Describe what your company does in a single sentence."
-            ]),
-            "Solution": extract_qna(result["content_solution"], [
-                r"How did you select * and what were the deciding factors?",
-                r"Describe the scope of work in detail, including the project steps, key deliverables, and technologies used.",
-                r"What was the scope of their involvement?",
-                r"How did you find *?",
-                r"How did you select *?",
-                r"How did you select this *?",
-                r"How did you come to work with *?"
-                r"How many people from *'s team worked with you, and what were their positions?",
-                r"What is the team composition?",
-                r"What was the team composition?",
-                r"How did you come to work with *?",
-                r"How much have you invested with them?",
-                r"What is the status of this engagement?",
-                r"Why did you select *?",
-                r"Could you provide a sense of the size of this initiative in financial terms?",
-                r"How many teammates from *?",
-                r"Describe the scope of work in detail. Please include a summary of key deliverables.",
-                r"How many resources from *?",
-                r"Describe the project and the services they provided in detail.",
-                r"Please describe the scope of their work.",
-                r"What was your process in selecting *?"
-                r"Can you provide a ballpark figure for the size of the work that *?",
-                r"What's the status of this engagement?"
-            ]),
-            "Opportunity & Challenge": extract_qna(result["content_opportunity_challenge"], [
-                r"For what projects/services did your company hire *, and what were your goals?",
-                r"What specific goals or objectives did you hire *?",
-                r"What challenge were you trying to address with *?",
-                r"For what projects/services did your company hire *?",
-                r"What was the business challenge that you were trying to address when you approached *?",
-                r"What business challenge were you trying to address with *?",
-                r"What was your goal in working with *?",
-                r"What were your goals for this project?",
-                r"What specific goals or objectives did you hire *",
-                r"What specific goals or objectives did you hire * to accomplish?",
-                r"What challenge were you addressing when you hired *?"
-            ]),
-            "Feedback": extract_qna(result["content_results_feedback"], [
-                r"What evidence can you share that demonstrates the impact of the engagement?",
-                r"Are there any areas they could improve?",
-                r"What did you find most impressive about them?",
-                r"Can you share any outcomes from the project that demonstrate progress or success?",
-                r"How effective was the workflow between your team and theirs?",
-                r"What did you find most impressive or unique about this company?",
-                r"Can you share any information that demonstrates the impact that this project has had on your business?",
-                r"Could you share any evidence that would demonstrate the productivity, quality of work, or the impact of the engagement?",
-                r"Can you share any measurable outcomes of the project or general feedback about the deliverables?",
-                r"Describe their project management style, including communication tools and timeliness.",
-                r"Are there any areas for improvement or something they could have done differently?",
-                r"What were the measurable outcomes from the project that demonstrate progress or success?",
-                r"Did they deliver items on time?",
-                r"How did they respond to your needs?",
-                r"What was your primary form of communication with *?",
-                r"How satisfied are you with the work of *?",
-                r"Is there anything unique about *?",
-                r"Looking back on the work so far, is there any area that you think they could improve upon or something that you might do differently?",
-                r"What advice would you give a future client of theirs?",
-                r"Describe their project management",
-                r"How was project management arranged and how effective was it\?",
-                r"What stood out to you about their communication or project delivery\?",
-                r"What made you happiest working with \*?",
-                r"What aspect of their performance did you appreciate the most\?",
-                r"What impressed you most about \*?",
-                r"What improvements would you suggest for \*?",
-                r"What’s one thing \* could do better\?",
-                r"What has been the greatest result of the work done by \*?",
-                r"What has your experience been like collaborating with the team at \*?",
-                r"Do you have any advice for potential customers?",
-                r"What kind of impact did this project have on your company?",
-                r"What could have been done differently on this project?",
-                r"What sets \* apart from other vendors you’ve worked with?",
-                r"Are there any areas for improvement",
-                r"Do you have any advice for potential customers\?",
-                r"How was project management arranged and how effective was it\?",
-                r"How did your relationship with your partner evolve\?",
-                r"What advice do you have for clients with similar needs to yours\?",
-                r"In what ways can they improve\?"
-            ])
+            "Background": extract_qna(result["content_background"], BACKGROUND_QUESTIONS),
+            "Solution": extract_qna(result["content_solution"], SOLUTION_QUESTIONS),
+            "Opportunity & Challenge": extract_qna(result["content_opportunity_challenge"], CHALLENGE_QUESTIONS),
+            "Feedback": extract_qna(result["content_results_feedback"], FEEDBACK_QUESTIONS)
         }
 
         final_results.append(formatted_result)
 
     return final_results
 
+def get_signature_fields() -> List[str]:
+    if settings.REVIEW_DEDUPE_ENABLED and settings.REVIEW_MINHASH_FIELD:
+        return [settings.REVIEW_MINHASH_FIELD]
+    return []
+
+def collapse_review_duplicates(results: list):
+    if not settings.REVIEW_DEDUPE_ENABLED or not settings.REVIEW_MINHASH_FIELD:
+        return results, []
+
+    # Only signatures stored at ingest are used: signing reviews here would block the
+    # event loop. Reviews indexed without one are kept as they are.
+    return collapse_duplicates(results, lambda result: result.get(settings.REVIEW_MINHASH_FIELD) or None, settings.REVIEW_DEDUPE_THRESHOLD)
+
 def build_search_filter(review_date_from: str, industries: list, company_sizes: list, project_budgets: list):
     filter_clauses = []
     if review_date_from:
@@ -301,6 +529,8 @@ def build_search_filter(review_date_from: str, industries: list, company_sizes:
     return " and ".join(filter_clauses) if filter_clauses else None
 
 async def _search(query: str, review_date_from: str, industries: str):
+    from openai import AzureOpenAI
+    from azure.search.documents.models import QueryType, QueryCaptionType, QueryAnswerType, VectorizedQuery
     open_ai_client = AzureOpenAI(
         api_key = settings.AZURE_OPENAI_KEY,  
         api_version = settings.API_VERSION,
@@ -428,9 +658,17 @@ def clean_vendor_name(answer):
     """Removes any leading text that ends with '?' from the beginning of the answer."""
     return re.sub(r"^.*?\?\s*", "", answer).strip()
 
-def extract_qna(text, question_patterns):
+@lru_cache(maxsize=None)
+def compile_question_patterns(question_patterns: tuple):
     question_regex = "|".join(question_patterns)
-    matches = re.split(rf"({question_regex})", text)
+    return re.compile(rf"({question_regex})"), re.compile(question_regex)
+
+def get_prompt_regexes() -> dict:
+    return {field: compile_question_patterns(patterns)[1] for field, patterns in REVIEW_QUESTIONS.items()}
+
+def extract_qna(text, question_patterns):
+    split_regex, question_regex = compile_question_patterns(tuple(question_patterns))
+    matches = split_regex.split(text)
 
     result = []
     current_question = None
@@ -441,7 +679,7 @@ def extract_qna(text, question_patterns):
         if not segment:
             continue
 
-        if re.match(question_regex, segment):
+        if question_regex.match(segment):
             if current_question and current_answer:
                 clean_answer = clean_vendor_name(segment.lstrip("?").strip())
                 result.append(f"A: {' '.join(current_answer)}")
@@ -2,33 +2,106 @@ import uuid
 from bson import ObjectId
 from typing import List, Optional
 from app.db import company_profiles
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+from app.config import settings
 from app.graphql.types import Profile
+from app.utils.keyword_index import keyword_clause, with_review_terms
+from app.utils.result_cache import build_result_cache
 import re
 
-async def insert_items(items: List[Profile]):
+DUPLICATE_KEY_ERROR = 11000
+
+profiles_cache = build_result_cache("profiles", settings.PROFILES_CACHE_MAX_ENTRIES, settings.PROFILES_CACHE_TTL_SECONDS)
+
+async def insert_items(items: List[Profile], update_existing: bool = False, collection=company_profiles):
+    """Upserts a batch of scraped profiles by url in one unordered bulk_write.
+
+    New profiles are inserted. Existing ones are skipped unless update_existing is set,
+    in which case their fields are overwritten. Returns the per-batch counts.
+    """
+    counts = {"inserted": 0, "updated": 0, "skipped": 0, "failed": 0}
+    operations = []
+    for item in items:
+        fields = {key: value for key, value in with_review_terms(item).items() if key not in ("_id", "id")}
+        if update_existing:
+            update = {"$set": fields, "$setOnInsert": {"id": str(uuid.uuid4())}}
+        else:
+            update = {"$setOnInsert": {**fields, "id": str(uuid.uuid4())}}
+        operations.append(UpdateOne({"url": item["url"]}, update, upsert=True))
+
+    if not operations:
+        return counts
+
     try:
-        to_update = []
-        for item in items:
-            existing = await company_profiles.find_one({"url":item["url"]})
-            if existing is None:
-                item["id"] = str(uuid.uuid4())
-                to_update.append(item)
-        
-        await company_profiles.insert_many(to_update)
-    except:
-        print('Company profiles can not be inserted...')
+        result = await collection.bulk_write(operations, ordered=False)
+        details = result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        for error in details.get("writeErrors", []):
+            # A concurrent batch inserted the same url first.
+            if error.get("code") == DUPLICATE_KEY_ERROR:
+                counts["skipped"] += 1
+            else:
+                counts["failed"] += 1
+                print(f"Company profile {items[error['index']].get('url')} can not be upserted: {error.get('errmsg')}")
+
+    counts["inserted"] += len(details.get("upserted", []))
+    counts["updated"] += details.get("nModified", 0)
+    counts["skipped"] += details.get("nMatched", 0) - details.get("nModified", 0)
+    if counts["inserted"] or counts["updated"]:
+        await profiles_cache.invalidate()
+    return counts
 
 async def enrich_reviewer_with_linkedin_url(id: id, reviewer_name: str, reviewer_location: str, linkedin_url: str):
-    await company_profiles.update_one(
-        {
-            "_id": ObjectId(id),
-            "reviews.reviewer.name": reviewer_name,
-            "reviews.reviewer.location": reviewer_location
-        },
-        {
-            "$set": {"reviews.$.reviewer.linkedinUrl": linkedin_url}
-        }
-    )
+    return await enrich_reviewers_with_linkedin_urls([{
+        "id": id,
+        "reviewer_name": reviewer_name,
+        "reviewer_location": reviewer_location,
+        "linkedin_url": linkedin_url
+    }])
+
+async def enrich_reviewers_with_linkedin_urls(results: List[dict]):
+    """Applies many reviewer LinkedIn lookups in one unordered bulk_write.
+
+    Each result holds the company profile id, reviewer_name, reviewer_location and
+    linkedin_url. arrayFilters update every review of that reviewer, not just the first.
+    The $elemMatch makes "matched" count only profiles that have a review by the reviewer.
+    """
+    if not results:
+        return {"matched": 0, "modified": 0}
+
+    operations = [
+        UpdateOne(
+            {
+                "_id": ObjectId(result["id"]),
+                "reviews": {"$elemMatch": {"reviewer.name": result["reviewer_name"], "reviewer.location": result["reviewer_location"]}}
+            },
+            {"$set": {"reviews.$[review].reviewer.linkedinUrl": result["linkedin_url"]}},
+            array_filters=[{
+                "review.reviewer.name": result["reviewer_name"],
+                "review.reviewer.location": result["reviewer_location"]
+            }]
+        )
+        for result in results
+    ]
+
+    result = await company_profiles.bulk_write(operations, ordered=False)
+    if result.modified_count:
+        await profiles_cache.invalidate()
+    return {"matched": result.matched_count, "modified": result.modified_count}
+
+async def watch_company_profile_changes(collection=company_profiles):
+    """Invalidates the profiles cache on every change, including writes made outside this service.
+
+    Change streams need a replica set, so this only runs with PROFILES_CACHE_CHANGE_STREAM_ENABLED.
+    """
+    async with collection.watch() as stream:
+        async for _ in stream:
+            # Coalesce a burst of changes, such as one bulk upsert, into one invalidation.
+            while await stream.try_next() is not None:
+                pass
+            await profiles_cache.invalidate()
 
 async def search_profiles(
     reviewer_names: Optional[List[str]] = None,
@@ -46,7 +119,14 @@ async def search_profiles(
     challenge_client_keywords: Optional[List[str]] = None,
     solution_client_keywords: Optional[List[str]] = None,
     feedback_client_keywords: Optional[List[str]] = None,
+    projection: Optional[dict] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
 ) -> List[dict]:
+    """Returns the matching profiles ordered by _id.
+
+    With a limit, only the page of profiles whose _id follows after is read (keyset pagination).
+    """
     any_filters_applied = any([
         reviewer_names,
         exclude_anonymous,
@@ -66,13 +146,112 @@ async def search_profiles(
     ])
 
     if not any_filters_applied:
-        return await company_profiles.find().to_list(length=None)
+        query = {"_id": {"$gt": ObjectId(after)}} if after else {}
+        cursor = company_profiles.find(query, projection).sort("_id", ASCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+
+    pipeline = build_search_profiles_pipeline(
+        reviewer_names=reviewer_names,
+        focus_names=focus_names,
+        project_focus_names=project_focus_names,
+        min_reviews=min_reviews,
+        max_reviews=max_reviews,
+        include_only_profiles_with_linkedin_url=include_only_profiles_with_linkedin_url,
+        include_only_profiles_without_linkedin_url=include_only_profiles_without_linkedin_url,
+        ids=ids,
+        industry_names=industry_names,
+        reviewer_titles=reviewer_titles,
+        background_client_keywords=background_client_keywords,
+        challenge_client_keywords=challenge_client_keywords,
+        solution_client_keywords=solution_client_keywords,
+        feedback_client_keywords=feedback_client_keywords
+    )
+
+    if after:
+        pipeline[0]["$match"].setdefault("_id", {})["$gt"] = ObjectId(after)
+    # Sorting right after the first $match walks the _id index, so $limit stops the scan early.
+    pipeline.insert(1, {"$sort": {"_id": 1}})
+    if limit:
+        pipeline.append({"$limit": limit})
+    if projection:
+        pipeline.append({"$project": projection})
+
+    return await company_profiles.aggregate(pipeline).to_list(length=None)
+
+def count_by(field: str) -> List[dict]:
+    return [
+        {"$unwind": "$reviews"},
+        {"$match": {f"reviews.{field}": {"$nin": [None, ""]}}},
+        {"$group": {"_id": f"$reviews.{field}", "value": {"$sum": 1}}},
+        {"$sort": {"value": -1, "_id": 1}},
+        {"$project": {"_id": 0, "key": "$_id", "value": 1}}
+    ]
+
+async def aggregate_profiles(**filters) -> dict:
+    """Counts the matching profiles and their reviews by industry, country, project size and category in one $facet."""
+    pipeline = build_search_profiles_pipeline(**filters) if any(filters.values()) else []
+    pipeline += [
+        {"$project": {"reviews": {"$map": {
+            "input": {"$ifNull": ["$reviews", []]},
+            "as": "review",
+            "in": {
+                "industry": "$$review.reviewer.industry",
+                # Reviewer locations look like "Austin, Texas" or "London, United Kingdom"; the last part is the country.
+                "country": {"$cond": [
+                    {"$gt": [{"$ifNull": ["$$review.reviewer.location", ""]}, ""]},
+                    {"$trim": {"input": {"$arrayElemAt": [{"$split": ["$$review.reviewer.location", ","]}, -1]}}},
+                    None
+                ]},
+                "size": "$$review.project.size",
+                "category": "$$review.project.category"
+            }
+        }}}},
+        {"$facet": {
+            "company_count": [{"$count": "value"}],
+            "reviews_count": [{"$project": {"value": {"$size": "$reviews"}}}, {"$group": {"_id": None, "value": {"$sum": "$value"}}}],
+            "by_industries": count_by("industry"),
+            "by_locations": count_by("country"),
+            "by_project_sizes": count_by("size"),
+            "by_project_categories": count_by("category")
+        }}
+    ]
+
+    result = (await company_profiles.aggregate(pipeline).to_list(length=None))[0]
+    return {
+        **result,
+        "company_count": result["company_count"][0]["value"] if result["company_count"] else 0,
+        "reviews_count": result["reviews_count"][0]["value"] if result["reviews_count"] else 0
+    }
+
+def build_regex(values: List[str]) -> str:
+    return "|".join([re.escape(value) for value in values])
 
+def regex_match(field: str, pattern: str) -> dict:
+    return {"$regexMatch": {"input": {"$ifNull": [field, ""]}, "regex": pattern, "options": "i"}}
+
+def build_search_profiles_pipeline(
+    reviewer_names: Optional[List[str]] = None,
+    focus_names: Optional[List[str]] = None,
+    project_focus_names: Optional[List[str]] = None,
+    min_reviews: Optional[int] = None,
+    max_reviews: Optional[int] = None,
+    include_only_profiles_with_linkedin_url: Optional[bool] = False,
+    include_only_profiles_without_linkedin_url: Optional[bool] = False,
+    ids: Optional[List[str]] = None,
+    industry_names: Optional[List[str]] = None,
+    reviewer_titles: Optional[List[str]] = None,
+    background_client_keywords: Optional[List[str]] = None,
+    challenge_client_keywords: Optional[List[str]] = None,
+    solution_client_keywords: Optional[List[str]] = None,
+    feedback_client_keywords: Optional[List[str]] = None,
+) -> List[dict]:
+    """Profile-level $match followed by a $filter that trims reviews to the matching ones server-side."""
     query = {}
 
     if focus_names:
-        regex_pattern = "|".join([re.escape(focus_name) for focus_name in focus_names])
-        query["focus"] = {"$regex": regex_pattern, "$options": "i"}
+        query["focus"] = {"$regex": build_regex(focus_names), "$options": "i"}
 
     if min_reviews is not None:
         query.setdefault("summary.noOfReviews", {})["$gte"] = min_reviews
@@ -83,123 +262,83 @@ async def search_profiles(
         query["_id"] = {"$in": [ObjectId(id) for id in ids]}
 
     review_query = {}
+    review_conditions = []
 
     if include_only_profiles_with_linkedin_url:
         review_query["reviewer.linkedinUrl"] = {"$exists": True, "$ne": ""}
+        review_conditions.append(
+            {"$regexMatch": {"input": {"$ifNull": ["$$review.reviewer.linkedinUrl", ""]}, "regex": "linkedin\\.com/in/"}}
+        )
 
     if include_only_profiles_without_linkedin_url:
         review_query["reviewer.linkedinUrl"] = {"$exists": False }
+        review_conditions.append({"$eq": [{"$ifNull": ["$$review.reviewer.linkedinUrl", ""]}, ""]})
 
     if project_focus_names:
-        project_focus_regex_pattern = "|".join([re.escape(name) for name in project_focus_names])
-        review_query["project.allCategories"] = {"$regex": project_focus_regex_pattern, "$options": "i"}
+        review_query["project.allCategories"] = {"$regex": build_regex(project_focus_names), "$options": "i"}
 
     if reviewer_names:
-        reviewer_names_regex_pattern = "|".join([re.escape(name) for name in reviewer_names])
+        reviewer_names_regex_pattern = build_regex(reviewer_names)
         review_query["reviewer.name"] = {"$regex": reviewer_names_regex_pattern, "$options": "i"}
+        review_conditions.append(regex_match("$$review.reviewer.name", reviewer_names_regex_pattern))
 
     if industry_names:
-        industries_regex_pattern = "|".join([re.escape(name) for name in industry_names])
+        industries_regex_pattern = build_regex(industry_names)
         review_query["reviewer.industry"] = {"$regex": industries_regex_pattern, "$options": "i"}
+        review_conditions.append(regex_match("$$review.reviewer.industry", industries_regex_pattern))
 
     if reviewer_titles:
-        titles_regex_pattern = "|".join([re.escape(title) for title in reviewer_titles])
+        titles_regex_pattern = build_regex(reviewer_titles)
         review_query["reviewer.title"] = {"$regex": titles_regex_pattern, "$options": "i"}
+        review_conditions.append(regex_match("$$review.reviewer.title", titles_regex_pattern))
 
-    background_regex = "|".join([re.escape(keyword) for keyword in background_client_keywords]) if background_client_keywords else None
-    challenge_regex = "|".join([re.escape(keyword) for keyword in challenge_client_keywords]) if challenge_client_keywords else None
-    solution_regex = "|".join([re.escape(keyword) for keyword in solution_client_keywords]) if solution_client_keywords else None
-    feedback_regex = "|".join([re.escape(keyword) for keyword in feedback_client_keywords]) if feedback_client_keywords else None
-    
     label_conditions = []
-
-    if background_client_keywords:
-        label_conditions.append(
-            {"content": {"$elemMatch": {"label": "BACKGROUND", "text": {"$regex": background_regex, "$options": "i"}}}}
-        )
-
-    if challenge_client_keywords:
-        label_conditions.append(
-            {"content": {"$elemMatch": {"label": "OPPORTUNITY / CHALLENGE", "text": {"$regex": challenge_regex, "$options": "i"}}}}
-        )
-
-    if solution_client_keywords:
+    content_conditions = []
+    keyword_clauses = []
+
+    for label, keywords in [
+        ("BACKGROUND", background_client_keywords),
+        ("OPPORTUNITY / CHALLENGE", challenge_client_keywords),
+        ("SOLUTION", solution_client_keywords),
+        ("RESULTS & FEEDBACK", feedback_client_keywords)
+    ]:
+        if not keywords:
+            continue
+        keywords_regex = build_regex(keywords)
         label_conditions.append(
-            {"content": {"$elemMatch": {"label": "SOLUTION", "text": {"$regex": solution_regex, "$options": "i"}}}}
+            {"content": {"$elemMatch": {"label": label, "text": {"$regex": keywords_regex, "$options": "i"}}}}
         )
-
-    if feedback_client_keywords:
-        label_conditions.append(
-            {"content": {"$elemMatch": {"label": "RESULTS & FEEDBACK", "text": {"$regex": feedback_regex, "$options": "i"}}}}
+        content_conditions.append(
+            {"$and": [{"$eq": ["$$content.label", label]}, regex_match("$$content.text", keywords_regex)]}
         )
+        keyword_clauses += [keyword_clause(label, keyword) for keyword in keywords]
 
     if label_conditions:
         review_query["$or"] = label_conditions
+        review_conditions.append({"$anyElementTrue": [{"$map": {
+            "input": {"$ifNull": ["$$review.content", []]},
+            "as": "content",
+            "in": {"$or": content_conditions}
+        }}]})
 
     if review_query:
         query["reviews"] = {"$elemMatch": review_query}
 
-    items = await company_profiles.find(query).to_list(length=None)
+    # The keyword index narrows the candidates; the regexes above still decide the matches.
+    if settings.REVIEW_KEYWORD_INDEX_ENABLED and keyword_clauses and None not in keyword_clauses:
+        query["$or"] = keyword_clauses
 
-    for item in items:
-        if "reviews" in item and item["reviews"]:
-            filtered_reviews = []
-
-            for review in item["reviews"]:
-                reviewer = review.get("reviewer", {})
-
-                matches_reviewer_industry = (
-                    not industry_names or any(re.search(rf"{re.escape(industry)}", reviewer.get("industry", ""), re.IGNORECASE) for industry in industry_names)
-                )
-
-                matches_reviewer_name = (
-                    not reviewer_names or any(re.search(rf"{re.escape(name)}", reviewer.get("name", ""), re.IGNORECASE) for name in reviewer_names)
-                )
-
-                matches_reviewer_title = (
-                    not reviewer_titles or any(re.search(rf"{re.escape(title)}", reviewer.get("title", ""), re.IGNORECASE) for title in reviewer_titles)
-                )
-
-                has_linkedin_url = (
-                    not include_only_profiles_with_linkedin_url 
-                    or (
-                        reviewer.get("linkedinUrl") 
-                        and "linkedin.com/in/" in reviewer.get("linkedinUrl")
-                    )
-                )
-
-                does_not_has_linkedin_url = (
-                    not include_only_profiles_without_linkedin_url 
-                    or ("linkedinUrl" not in reviewer or not reviewer.get("linkedinUrl"))
-                )
-
-                if not (matches_reviewer_name and matches_reviewer_industry and matches_reviewer_title and has_linkedin_url and does_not_has_linkedin_url):
-                    continue
-
-                if not (
-                    background_client_keywords
-                    or challenge_client_keywords
-                    or solution_client_keywords
-                    or feedback_client_keywords
-                ):
-                    filtered_reviews.append(review)
-                    continue
-                    
-
-                matches_content = any(
-                    (background_client_keywords and c["label"] == "BACKGROUND" and re.search(background_regex, c["text"], re.IGNORECASE))
-                    or (challenge_client_keywords and c["label"] == "OPPORTUNITY / CHALLENGE" and re.search(challenge_regex, c["text"], re.IGNORECASE))
-                    or (solution_client_keywords and c["label"] == "SOLUTION" and re.search(solution_regex, c["text"], re.IGNORECASE))
-                    or (feedback_client_keywords and c["label"] == "RESULTS & FEEDBACK" and re.search(feedback_regex, c["text"], re.IGNORECASE))
-                    for c in review.get("content", [])
-                )
-
-                if matches_content:
-                    filtered_reviews.append(review)
-
-            item["reviews"] = filtered_reviews
-
-    return [item for item in items if item["reviews"]]
+    pipeline = [{"$match": query}]
+
+    if review_conditions:
+        pipeline.append({"$addFields": {"reviews": {"$filter": {
+            "input": {"$ifNull": ["$reviews", []]},
+            "as": "review",
+            "cond": {"$and": review_conditions}
+        }}}})
+
+    pipeline.append({"$match": {"reviews.0": {"$exists": True}}})
+    return pipeline
 
 async def search_profiles_v2(
     reviewer_names: Optional[List[str]] = None,
@@ -217,58 +356,47 @@ async def search_profiles_v2(
     challenge_client_keywords: Optional[List[str]] = None,
     solution_client_keywords: Optional[List[str]] = None,
     feedback_client_keywords: Optional[List[str]] = None,
+    top_k: int = 20,
+    projection: Optional[dict] = None,
 ) -> List[dict]:
+    """Ranked full-text search served by the profile_text index.
+
+    The focus names and client keywords are the search terms, matched with stemming against
+    focus, summary and review content. The other filters narrow the matches as in
+    search_profiles. Returns the top_k profiles by text score, then by number of reviews.
+    """
+    search_terms = [
+        term
+        for terms in [focus_names, background_client_keywords, challenge_client_keywords, solution_client_keywords, feedback_client_keywords]
+        for term in terms or []
+    ]
 
-    query = {}
-
-    if focus_names:
-        query["$text"] = {"$search": " ".join(focus_names)}
-
-    if min_reviews is not None:
-        query["summary.noOfReviews"] = {"$gte": min_reviews}
-    if max_reviews is not None:
-        query["summary.noOfReviews"] = {"$lte": max_reviews}
-
-    if ids:
-        query["_id"] = {"$in": [ObjectId(id) for id in ids]}
-
-    review_query = {}
-
-    if include_only_profiles_with_linkedin_url:
-        review_query["reviewer.linkedinUrl"] = {"$regex": "linkedin.com/in/"}
+    pipeline = build_search_profiles_pipeline(
+        reviewer_names=reviewer_names,
+        project_focus_names=project_focus_names,
+        min_reviews=min_reviews,
+        max_reviews=max_reviews,
+        include_only_profiles_with_linkedin_url=include_only_profiles_with_linkedin_url,
+        include_only_profiles_without_linkedin_url=include_only_profiles_without_linkedin_url,
+        ids=ids,
+        industry_names=industry_names,
+        reviewer_titles=reviewer_titles
+    )
 
-    if include_only_profiles_without_linkedin_url:
-        review_query["reviewer.linkedinUrl"] = {"$exists": False}
+    if search_terms:
+        # $text has to be in the first stage to use the text index.
+        pipeline[0]["$match"]["$text"] = {"$search": " ".join(search_terms)}
+        sort = {"score": {"$meta": "textScore"}, "summary.noOfReviews": -1}
+    else:
+        sort = {"summary.noOfReviews": -1, "_id": 1}
 
-    if industry_names:
-        review_query["reviewer.industry"] = {"$in": industry_names}
+    # After the review $filter and its $match, so profiles those stricter conditions drop
+    # are replaced. $sort directly followed by $limit keeps only a top_k heap.
+    pipeline += [{"$sort": sort}, {"$limit": top_k}]
 
-    if reviewer_titles:
-        review_query["reviewer.title"] = {"$in": reviewer_titles}
-
-    # Keyword Searches for Reviews
-    keyword_conditions = []
-    if background_client_keywords:
-        keyword_conditions.append({"$text": {"$search": " ".join(background_client_keywords)}})
-    if challenge_client_keywords:
-        keyword_conditions.append({"$text": {"$search": " ".join(challenge_client_keywords)}})
-    if solution_client_keywords:
-        keyword_conditions.append({"$text": {"$search": " ".join(solution_client_keywords)}})
-    if feedback_client_keywords:
-        keyword_conditions.append({"$text": {"$search": " ".join(feedback_client_keywords)}})
-
-    if keyword_conditions:
-        review_query["$or"] = keyword_conditions
-
-    pipeline = [
-        {"$match": query},
-        {"$unwind": "$reviews"},
-        {"$match": review_query},
-        {"$group": {"_id": "$_id", "reviews": {"$push": "$reviews"}}},
-        {"$match": {"reviews": {"$ne": []}}},
-        {"$addFields": {"text_score": {"$meta": "textScore"}}},
-        {"$sort": {"text_score": -1, "summary.noOfReviews": -1}},
-        {"$limit": 100}
-    ]
+    if search_terms:
+        pipeline.append({"$addFields": {"score": {"$meta": "textScore"}}})
+    if projection:
+        pipeline.append({"$project": {**projection, "score": 1} if search_terms else projection})
 
-    return await company_profiles.aggregate(pipeline).to_list(length=None)
\ No newline at end of file
+    return await company_profiles.aggregate(pipeline).to_list(length=None)
@@ -0,0 +1,124 @@
+from app.config import settings
+from app.services.chat_service import search, analyze
+from app.services.user_service import get_popular_requests
+from app.utils import metrics
+from app.utils.result_cache import build_result_cache
+from collections import defaultdict
+from typing import Optional
+import asyncio
+import datetime
+import time
+
+popular_queries_cache = build_result_cache(
+    "popular_queries",
+    settings.POPULAR_QUERIES_MAX_ENTRIES,
+    settings.POPULAR_QUERIES_MAX_AGE_SECONDS
+)
+
+def normalize_filter_values(values) -> Optional[list]:
+    # Omitted filters arrive as (None,) from SearchRequest's defaults.
+    if not isinstance(values, (list, tuple)):
+        return None
+    values = sorted({value for value in values if value})
+    return values or None
+
+def normalize_request(request_type: str, request: dict) -> dict:
+    """The fields of a Search or Analyze payload that decide its result, in canonical form."""
+    review_date_from = request.get("review_date_from")
+    normalized = {
+        "request_type": request_type,
+        "query": " ".join((request.get("query") or "").casefold().split()),
+        "review_date_from": review_date_from if isinstance(review_date_from, str) and review_date_from else None,
+        "industries": normalize_filter_values(request.get("industries")),
+        "company_sizes": normalize_filter_values(request.get("company_sizes")),
+        "project_budgets": normalize_filter_values(request.get("project_budgets")),
+    }
+    if request_type == "Search":
+        normalized["limit"] = request.get("limit") or 500
+    else:
+        normalized["analyze_mode"] = request.get("analyze_mode") or "llm"
+    return normalized
+
+async def get_precomputed_response(request_type: str, request: dict):
+    if not settings.POPULAR_QUERIES_ENABLED:
+        return None
+    entry = await popular_queries_cache.get(normalize_request(request_type, request))
+    # The cache TTL restarts when an entry is copied from Redis, so the age is checked here.
+    if entry is None or time.time() - entry["computedAt"] >= settings.POPULAR_QUERIES_MAX_AGE_SECONDS:
+        return None
+    metrics.increment(f"popular_queries_hits_total:{request_type}")
+    return entry["response"]
+
+async def find_popular_requests() -> list:
+    """Merges the logged payloads that normalize to the same request and keeps the most frequent."""
+    since = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=settings.POPULAR_QUERIES_WINDOW_DAYS)
+    counts = defaultdict(int)
+    requests = {}
+    for logged in await get_popular_requests(since, settings.POPULAR_QUERIES_SCAN_LIMIT):
+        normalized = normalize_request(logged["request_type"], logged)
+        if not normalized["query"]:
+            continue
+        key = popular_queries_cache.key(normalized)
+        counts[key] += logged["count"]
+        requests[key] = normalized
+
+    popular = sorted(counts, key=counts.get, reverse=True)[:settings.POPULAR_QUERIES_TOP_N]
+    return [requests[key] for key in popular if counts[key] >= settings.POPULAR_QUERIES_MIN_COUNT]
+
+async def compute_response(request: dict):
+    arguments = {
+        "query": request["query"],
+        "review_date_from": request["review_date_from"],
+        "industries": request["industries"],
+        "company_sizes": request["company_sizes"],
+        "project_budgets": request["project_budgets"]
+    }
+    if request["request_type"] == "Search":
+        return await search(**arguments, limit=request["limit"])
+    results, _ = await analyze(**arguments, mode=request["analyze_mode"])
+    return results
+
+async def precompute_popular_queries() -> dict:
+    """Computes the popular requests whose cached response is missing or older than the refresh age.
+
+    Cached responses stay servable until POPULAR_QUERIES_MAX_AGE_SECONDS, so a refresh
+    replaces an entry while users keep being served the previous one.
+    """
+    summary = {"popular": 0, "computed": 0, "fresh": 0, "failed": 0}
+    popular = await find_popular_requests()
+    summary["popular"] = len(popular)
+    semaphore = asyncio.Semaphore(max(1, settings.POPULAR_QUERIES_CONCURRENCY))
+
+    async def refresh(request: dict):
+        entry = await popular_queries_cache.get(request)
+        if entry is not None and time.time() - entry["computedAt"] < settings.POPULAR_QUERIES_REFRESH_AFTER_SECONDS:
+            summary["fresh"] += 1
+            return
+        async with semaphore:
+            started_at = time.perf_counter()
+            try:
+                response = await compute_response(request)
+            except Exception as e:
+                summary["failed"] += 1
+                metrics.increment("popular_queries_errors_total")
+                print(f"Popular query {request['request_type']} '{request['query']}' can not be precomputed: {e}")
+                return
+            metrics.observe("popular_queries_compute_ms", (time.perf_counter() - started_at) * 1000)
+        await popular_queries_cache.set(request, {"response": response, "computedAt": time.time()})
+        summary["computed"] += 1
+
+    await asyncio.gather(*(refresh(request) for request in popular))
+    metrics.increment("popular_queries_precomputed_total", summary["computed"])
+    metrics.set_gauge("popular_queries_count", summary["popular"])
+    return summary
+
+async def run_popular_queries_job():
+    while True:
+        try:
+            await precompute_popular_queries()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics.increment("popular_queries_errors_total")
+            print(f"Popular queries can not be precomputed: {e}")
+        await asyncio.sleep(settings.POPULAR_QUERIES_INTERVAL_SECONDS)
@@ -1,17 +1,218 @@
 from app.db import users
 from app.db import user_requests
+from app.db import user_usage_rollups
+from app.config import settings
+from app.utils import metrics
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+import asyncio
+import time
 import uuid
 import datetime
+from typing import Optional
 
-async def log_user_api_request(email: str, requestType: str, request):
+QUOTA_ACTIONS = {"analyze", "search"}
+USAGE_ROLLUP_GRANULARITIES = ("hour", "day")
+
+_quota_leases = {}
+
+class UserRequestLogSink:
+    """Buffers user_requests documents in memory and writes them with insert_many.
+
+    A batch is flushed when it reaches batch_size or flush_interval_ms after its first
+    record. The queue is bounded: when it is full new records are dropped and counted
+    rather than slowing down the request that produced them. Each written batch also
+    increments the hourly and daily usage rollups when a rollup collection is given.
+    """
+
+    def __init__(self, collection, max_queue_size: int = 10000, batch_size: int = 500, flush_interval_ms: int = 1000, rollup_collection=None):
+        self.collection = collection
+        self.rollup_collection = rollup_collection
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self._task = None
+
+    def enqueue(self, document: dict) -> bool:
+        try:
+            self.queue.put_nowait(document)
+        except asyncio.QueueFull:
+            metrics.increment("user_requests_log_dropped_total")
+            return False
+        metrics.set_gauge("user_requests_log_queue_size", self.queue.qsize())
+        return True
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            try:
+                flush_at = loop.time() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    timeout = flush_at - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            finally:
+                await self.write(batch)
+
+    async def write(self, batch: list):
+        if not batch:
+            return
+        documents = [build_user_request_document(**record) for record in batch]
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+            metrics.increment("user_requests_log_written_total", len(documents))
+            metrics.observe("user_requests_log_batch_size", len(documents), metrics.SIZE_BUCKETS)
+        except Exception as e:
+            metrics.increment("user_requests_log_failed_total", len(documents))
+            print(f"User requests can not be logged: {e}")
+
+        if self.rollup_collection is not None:
+            await self.write_rollups(documents)
+
+    async def write_rollups(self, documents: list):
+        updates = build_usage_rollup_updates(documents)
+        try:
+            await self.rollup_collection.bulk_write(updates, ordered=False)
+            metrics.increment("user_usage_rollups_written_total", len(updates))
+        except Exception as e:
+            metrics.increment("user_usage_rollups_failed_total", len(updates))
+            print(f"User usage rollups can not be updated: {e}")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        batch = []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+            if len(batch) >= self.batch_size:
+                await self.write(batch)
+                batch = []
+        await self.write(batch)
+
+user_request_log_sink = UserRequestLogSink(
+    user_requests,
+    max_queue_size=settings.USER_REQUESTS_LOG_MAX_QUEUE_SIZE,
+    batch_size=settings.USER_REQUESTS_LOG_BATCH_SIZE,
+    flush_interval_ms=settings.USER_REQUESTS_LOG_FLUSH_INTERVAL_MS,
+    rollup_collection=user_usage_rollups if settings.USAGE_ROLLUPS_ENABLED else None
+)
+
+def build_user_request_document(email: str, requestType: str, request, createdAt: datetime.datetime, latencyMs: Optional[float] = None):
     document = {
         "id": str(uuid.uuid4()),
         "email": email,
         "request_type": requestType,
         "request": request.dict(),
-        "createdAt": datetime.datetime.now(datetime.UTC)
+        "createdAt": createdAt
     }
-    await user_requests.insert_one(document)
+    if latencyMs is not None:
+        document["latency_ms"] = latencyMs
+    return document
+
+def get_bucket_start(created_at: datetime.datetime, granularity: str) -> datetime.datetime:
+    bucket_start = created_at.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        bucket_start = bucket_start.replace(hour=0)
+    return bucket_start
+
+def build_usage_rollup_updates(documents: list) -> list:
+    """Sums a batch of user_requests documents into one upsert per user, type and time bucket."""
+    rollups = {}
+    for document in documents:
+        latency_ms = document.get("latency_ms")
+        for granularity in USAGE_ROLLUP_GRANULARITIES:
+            key = (document["email"], granularity, get_bucket_start(document["createdAt"], granularity), document["request_type"])
+            rollup = rollups.setdefault(key, {"count": 0, "latency_ms_count": 0, "latency_ms_sum": 0, "latency_ms_max": 0})
+            rollup["count"] += 1
+            if latency_ms is not None:
+                rollup["latency_ms_count"] += 1
+                rollup["latency_ms_sum"] += latency_ms
+                rollup["latency_ms_max"] = max(rollup["latency_ms_max"], latency_ms)
+
+    return [
+        UpdateOne(
+            {"email": email, "granularity": granularity, "bucketStart": bucket_start, "request_type": request_type},
+            {
+                "$inc": {"count": rollup["count"], "latency_ms_count": rollup["latency_ms_count"], "latency_ms_sum": rollup["latency_ms_sum"]},
+                "$max": {"latency_ms_max": rollup["latency_ms_max"]}
+            },
+            upsert=True
+        )
+        for (email, granularity, bucket_start, request_type), rollup in rollups.items()
+    ]
+
+async def log_user_api_request(email: str, requestType: str, request, latency_ms: Optional[float] = None):
+    user_request_log_sink.enqueue({
+        "email": email,
+        "requestType": requestType,
+        "request": request,
+        "createdAt": datetime.datetime.now(datetime.UTC),
+        "latencyMs": latency_ms
+    })
+
+async def get_usage_history(email: str, granularity: str, since: datetime.datetime, request_type: Optional[str] = None) -> list:
+    query = {"email": email, "granularity": granularity, "bucketStart": {"$gte": since}}
+    if request_type:
+        query["request_type"] = request_type
+    projection = {"_id": 0, "bucketStart": 1, "request_type": 1, "count": 1, "latency_ms_count": 1, "latency_ms_sum": 1, "latency_ms_max": 1}
+    history = []
+    async for rollup in user_usage_rollups.find(query, projection).sort("bucketStart", 1):
+        latency_ms_count = rollup.pop("latency_ms_count", 0)
+        latency_ms_sum = rollup.pop("latency_ms_sum", 0)
+        rollup["latency_ms_avg"] = latency_ms_sum / latency_ms_count if latency_ms_count else None
+        if not latency_ms_count:
+            rollup["latency_ms_max"] = None
+        history.append(rollup)
+    return history
+
+async def get_recent_queries(limit: int, scan: int = 1000) -> list:
+    """Most frequent search and analyze queries among the last scan logged requests."""
+    pipeline = [
+        {"$sort": {"createdAt": -1}},
+        {"$limit": scan},
+        {"$group": {"_id": "$request.query", "count": {"$sum": 1}, "lastAt": {"$max": "$createdAt"}}},
+        {"$match": {"_id": {"$type": "string", "$ne": ""}}},
+        {"$sort": {"count": -1, "lastAt": -1}},
+        {"$limit": limit}
+    ]
+    return [document["_id"] async for document in user_requests.aggregate(pipeline)]
+
+async def get_popular_requests(since: datetime.datetime, limit: int) -> list:
+    """Request payloads logged since the given time, grouped on the fields that decide the result."""
+    pipeline = [
+        {"$match": {"createdAt": {"$gte": since}, "request_type": {"$in": ["Search", "Analyze"]}}},
+        {"$group": {
+            "_id": {
+                "request_type": "$request_type",
+                "query": "$request.query",
+                "review_date_from": "$request.review_date_from",
+                "industries": "$request.industries",
+                "company_sizes": "$request.company_sizes",
+                "project_budgets": "$request.project_budgets",
+                "limit": "$request.limit",
+                "analyze_mode": "$request.analyze_mode"
+            },
+            "count": {"$sum": 1}
+        }},
+        {"$sort": {"count": -1}},
+        {"$limit": limit}
+    ]
+    return [{**document["_id"], "count": document["count"]} async for document in user_requests.aggregate(pipeline)]
 
 async def get_user(email: str):
     user = await users.find_one({"email": email})
@@ -19,6 +220,13 @@ async def get_user(email: str):
         user["_id"] = str(user["_id"])
     return user
 
+def get_user_plan(user: dict) -> str:
+    allocated = user.get("api_tokens_analyze_allocated", 0)
+    for plan, min_allocated in sorted(settings.PLAN_TIERS.items(), key=lambda x: x[1], reverse=True):
+        if allocated >= min_allocated:
+            return plan
+    return "free"
+
 async def create_user(email: str):
     document = {
         "id": str(uuid.uuid4()),
@@ -28,18 +236,85 @@ async def create_user(email: str):
         "api_tokens_search_allocated": 15,
         "api_tokens_search_used": 0
     }
-    await users.insert_one(document)
+    try:
+        await users.insert_one(document)
+    except DuplicateKeyError:
+        # Already registered; users.email is unique.
+        pass
+
+async def reserve_api_token(email: str, action: str):
+    """Atomically takes one token of the action's allowance, or returns None when none is left.
+
+    With QUOTA_LEASE_SIZE > 1 a worker takes several tokens in the same round trip and
+    serves the next reservations of that user locally until the lease expires.
+    """
+    used_field = f"api_tokens_{action}_used"
+    allocated_field = f"api_tokens_{action}_allocated"
+    key = (email, action)
+
+    lease = _quota_leases.get(key)
+    if lease and lease["available"] > 0 and lease["expires_at"] > time.monotonic():
+        lease["available"] -= 1
+        metrics.increment("quota_lease_hits_total")
+        return {"email": email, "action": action, "user": lease["user"]}
 
-async def update_search_api_tokens_usage(email: str, count: int = 1):
-    result = await users.update_one(
-        {"email": email},
-        {"$inc": {"api_tokens_search_used": count}}
+    lease_size = max(1, settings.QUOTA_LEASE_SIZE)
+    user = await users.find_one_and_update(
+        {"email": email, "$expr": {"$gt": [f"${allocated_field}", f"${used_field}"]}},
+        [{"$set": {used_field: {"$min": [{"$add": [f"${used_field}", lease_size]}, f"${allocated_field}"]}}}],
+        return_document=ReturnDocument.BEFORE
     )
-    return result
+    metrics.increment("quota_reservations_total")
 
-async def update_analyze_api_tokens_usage(email: str, count: int = 1):
-    result = await users.update_one(
-        {"email": email},
-        {"$inc": {"api_tokens_analyze_used": count}}
+    if user is None:
+        return None
+
+    user["_id"] = str(user["_id"])
+    leased = min(user[used_field] + lease_size, user[allocated_field]) - user[used_field]
+    if leased > 1:
+        available = leased - 1
+        if lease and lease["available"] > 0:
+            available += lease["available"]
+        _quota_leases[key] = {
+            "available": available,
+            "user": user,
+            "expires_at": time.monotonic() + settings.QUOTA_LEASE_TTL_SECONDS
+        }
+
+    return {"email": email, "action": action, "user": user}
+
+async def commit_api_token(reservation: dict):
+    # The token was already counted as used when it was reserved.
+    metrics.increment(f"quota_committed_total:{reservation['action']}")
+
+async def release_api_token(reservation: dict):
+    metrics.increment(f"quota_released_total:{reservation['action']}")
+    lease = _quota_leases.get((reservation["email"], reservation["action"]))
+    if lease and lease["expires_at"] > time.monotonic():
+        lease["available"] += 1
+        return
+
+    await users.update_one(
+        {"email": reservation["email"]},
+        {"$inc": {f"api_tokens_{reservation['action']}_used": -1}}
     )
-    return result
\ No newline at end of file
+
+async def flush_quota_leases(force: bool = False):
+    now = time.monotonic()
+    returns = []
+    for (email, action), lease in list(_quota_leases.items()):
+        if force or lease["expires_at"] <= now:
+            del _quota_leases[(email, action)]
+            if lease["available"] > 0:
+                returns.append(UpdateOne({"email": email}, {"$inc": {f"api_tokens_{action}_used": -lease["available"]}}))
+
+    if returns:
+        await users.bulk_write(returns, ordered=False)
+
+async def run_quota_lease_flusher():
+    while True:
+        await asyncio.sleep(settings.QUOTA_LEASE_TTL_SECONDS)
+        try:
+            await flush_quota_leases()
+        except Exception as e:
+            print(f"Quota leases can not be flushed: {e}")
\ No newline at end of file
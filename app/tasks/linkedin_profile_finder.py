@@ -1,7 +1,7 @@
 # import redis.asyncio as redis
 # from apify_client import ApifyClientAsync
 # from app.config import settings
-# from app.services.company_profile_service import search_profiles, enrich_reviewer_with_linkedin_url
+# from app.services.company_profile_service import search_profiles, enrich_reviewers_with_linkedin_urls
 # import asyncio
 # import json
 # import os
@@ -55,17 +55,14 @@
 #                         orgranic_results = items[0]["organicResults"]
 #                         if (len(orgranic_results) > 0):
 #                             url = orgranic_results[0]["url"]
-#                             await enrich_reviewer_with_linkedin_url(company_profile_id, reviewer_name, reviewer_location, url)
 #                             print(f"Fetched url: {url} for reviewer name: {reviewer_name} and reviwere location: {reviewer_location}")
-#                             return
+#                             return url
 #                         else:
-#                             url=""
-#                             await enrich_reviewer_with_linkedin_url(company_profile_id, reviewer_name, reviewer_location, url)
-#                             return
+#                             return ""
 #                     else:
 #                         print(f"Attempt {attempt + 1}/3: No items found. Retrying...")
 #                         await asyncio.sleep(2)
-#                         return
+#                         return None
 #             elif run_status["status"] in ["FAILED", "TIMED_OUT", "ABORTED"]:
 #                 raise Exception(f"Task failed with status: {run_status['status']}")
 #         else:
@@ -83,15 +80,26 @@
 #         if len(reviewers_to_enrich) == 0:
 #             return
         
+#         results = []
 #         for reviewer in reviewers_to_enrich:
 #             query = f"{reviewer['name']}, {reviewer.get('title', '')}, {reviewer.get('location', '')}, {reviewer.get('industry', '')}"
 #             run_id = await start_data_collection(query=query)
-#             await fetch_and_process_result(
+#             url = await fetch_and_process_result(
 #                 session_id="poc",
 #                 run_id=run_id, 
 #                 company_profile_id=str(company_profile["_id"]),
 #                 reviewer_name=reviewer['name'],
 #                 reviewer_location=reviewer['location'])
+#             if url is not None:
+#                 results.append({
+#                     "id": str(company_profile["_id"]),
+#                     "reviewer_name": reviewer['name'],
+#                     "reviewer_location": reviewer['location'],
+#                     "linkedin_url": url
+#                 })
+#
+#         counts = await enrich_reviewers_with_linkedin_urls(results)
+#         print(f"Enriched company profile {company_profile['_id']}: {counts['matched']} matched, {counts['modified']} modified")
 
 # async def execute_linkedin_profiles_finder_workflows_in_parallel(
 #     focus_names: Optional[List[str]] = None,
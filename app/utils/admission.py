@@ -0,0 +1,203 @@
+import asyncio
+import heapq
+import itertools
+import time
+import uuid
+from app.config import settings
+from app.utils import metrics
+
+ADMITTED = 1
+GLOBAL_LIMIT_REACHED = 0
+USER_LIMIT_REACHED = -1
+
+ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[4]) then
+    return 0
+end
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[5]) then
+    return -1
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[3])
+redis.call('PEXPIRE', KEYS[1], ARGV[6])
+redis.call('PEXPIRE', KEYS[2], ARGV[6])
+return 1
+"""
+
+class AdmissionRejected(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Too many analyze requests in flight.")
+        self.retry_after = retry_after
+
+class LocalAdmissionStore:
+    """In-process stand-in for the Redis store, used in tests and when Redis is unavailable."""
+
+    def __init__(self):
+        self.leases = {}
+
+    def _active(self, key: str, now: float) -> dict:
+        leases = self.leases.setdefault(key, {})
+        for lease_id in [lease_id for lease_id, expires_at in leases.items() if expires_at <= now]:
+            del leases[lease_id]
+        return leases
+
+    async def try_acquire(self, global_key: str, user_key: str, lease_id: str, global_limit: int, user_limit: int, ttl_ms: int) -> int:
+        now = time.time()
+        global_leases = self._active(global_key, now)
+        user_leases = self._active(user_key, now)
+        if len(global_leases) >= global_limit:
+            return GLOBAL_LIMIT_REACHED
+        if len(user_leases) >= user_limit:
+            return USER_LIMIT_REACHED
+        global_leases[lease_id] = user_leases[lease_id] = now + ttl_ms / 1000
+        return ADMITTED
+
+    async def release(self, global_key: str, user_key: str, lease_id: str):
+        self.leases.get(global_key, {}).pop(lease_id, None)
+        self.leases.get(user_key, {}).pop(lease_id, None)
+
+    async def in_flight(self, global_key: str) -> int:
+        return len(self._active(global_key, time.time()))
+
+class RedisAdmissionStore:
+    """Leases live in sorted sets scored by expiry, so a crashed worker's slots free themselves."""
+
+    def __init__(self, client):
+        self.client = client
+        self.acquire_script = client.register_script(ACQUIRE_SCRIPT)
+
+    async def try_acquire(self, global_key: str, user_key: str, lease_id: str, global_limit: int, user_limit: int, ttl_ms: int) -> int:
+        now = time.time()
+        return int(await self.acquire_script(
+            keys=[global_key, user_key],
+            args=[now, now + ttl_ms / 1000, lease_id, global_limit, user_limit, ttl_ms]
+        ))
+
+    async def release(self, global_key: str, user_key: str, lease_id: str):
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zrem(global_key, lease_id)
+            pipe.zrem(user_key, lease_id)
+            await pipe.execute()
+
+    async def in_flight(self, global_key: str) -> int:
+        return await self.client.zcount(global_key, time.time(), "+inf")
+
+class AdmissionController:
+    """Caps in-flight requests per user and overall and queues the excess by plan priority.
+
+    Queued requests are retried when a local slot is released and every poll interval,
+    which picks up slots released by other workers. A request that is still queued
+    when its queue deadline passes is rejected with AdmissionRejected.
+    """
+
+    def __init__(self, store, name: str, user_limit: int, global_limit: int, queue_timeout_ms: int,
+                 lease_ttl_ms: int, poll_interval_ms: int, plan_priorities: dict, fallback_store=None):
+        self.store = store
+        self.fallback_store = fallback_store
+        self.global_key = f"admission:{name}"
+        self.name = name
+        self.user_limit = user_limit
+        self.global_limit = global_limit
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.lease_ttl_ms = lease_ttl_ms
+        self.poll_interval = poll_interval_ms / 1000
+        self.plan_priorities = plan_priorities
+        self._waiters = []
+        self._sequence = itertools.count()
+
+    def user_key(self, email: str) -> str:
+        return f"{self.global_key}:{email}"
+
+    async def _try_acquire(self, email: str, lease_id: str) -> int:
+        args = (self.global_key, self.user_key(email), lease_id, self.global_limit, self.user_limit, self.lease_ttl_ms)
+        try:
+            return await self.store.try_acquire(*args)
+        except Exception:
+            if self.fallback_store is None:
+                raise
+            metrics.increment(f"admission_store_errors_total:{self.name}")
+            return await self.fallback_store.try_acquire(*args)
+
+    def _may_attempt(self, waiter: list) -> bool:
+        # Waiters held back only by their own per-user cap must not block others behind them.
+        if waiter[3]["user_blocked"]:
+            return True
+        for other in sorted(self._waiters):
+            if not other[3]["user_blocked"]:
+                return other is waiter
+        return True
+
+    async def acquire(self, email: str, plan: str) -> dict:
+        lease = {"email": email, "id": str(uuid.uuid4())}
+        started_at = time.perf_counter()
+
+        if not self._waiters and await self._try_acquire(email, lease["id"]) == ADMITTED:
+            metrics.increment(f"admission_admitted_total:{self.name}")
+            return lease
+
+        loop = asyncio.get_running_loop()
+        expires_at = loop.time() + self.queue_timeout
+        waiter = [self.plan_priorities.get(plan, len(self.plan_priorities)), next(self._sequence), asyncio.Event(), {"user_blocked": False}]
+        heapq.heappush(self._waiters, waiter)
+        metrics.increment(f"admission_queued_total:{self.name}")
+        metrics.set_gauge(f"admission_queue_size:{self.name}", len(self._waiters))
+
+        try:
+            while True:
+                if self._may_attempt(waiter):
+                    result = await self._try_acquire(email, lease["id"])
+                    if result == ADMITTED:
+                        metrics.increment(f"admission_admitted_total:{self.name}")
+                        metrics.observe(f"admission_queue_wait_ms:{self.name}", (time.perf_counter() - started_at) * 1000)
+                        return lease
+                    waiter[3]["user_blocked"] = result == USER_LIMIT_REACHED
+
+                remaining = expires_at - loop.time()
+                if remaining <= 0:
+                    metrics.increment(f"admission_rejected_total:{self.name}")
+                    raise AdmissionRejected(retry_after=max(1, int(self.poll_interval)))
+
+                waiter[2].clear()
+                try:
+                    await asyncio.wait_for(waiter[2].wait(), min(self.poll_interval, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+            metrics.set_gauge(f"admission_queue_size:{self.name}", len(self._waiters))
+            self._wake_waiters()
+
+    async def release(self, lease: dict):
+        args = (self.global_key, self.user_key(lease["email"]), lease["id"])
+        try:
+            await self.store.release(*args)
+        except Exception:
+            metrics.increment(f"admission_store_errors_total:{self.name}")
+        if self.fallback_store is not None:
+            await self.fallback_store.release(*args)
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        for waiter in self._waiters:
+            waiter[2].set()
+
+def build_admission_store():
+    if settings.ADMISSION_BACKEND == "redis":
+        import redis.asyncio as redis
+        return RedisAdmissionStore(redis.Redis(host=settings.REDIS_HOST, port=int(settings.REDIS_PORT), db=int(settings.REDIS_DB)))
+    return LocalAdmissionStore()
+
+analyze_admission_controller = AdmissionController(
+    build_admission_store(),
+    name="analyze",
+    user_limit=settings.ADMISSION_ANALYZE_USER_LIMIT,
+    global_limit=settings.ADMISSION_ANALYZE_GLOBAL_LIMIT,
+    queue_timeout_ms=settings.ADMISSION_QUEUE_TIMEOUT_MS,
+    lease_ttl_ms=settings.ADMISSION_LEASE_TTL_MS,
+    poll_interval_ms=settings.ADMISSION_POLL_INTERVAL_MS,
+    plan_priorities=settings.ADMISSION_PLAN_PRIORITIES,
+    fallback_store=LocalAdmissionStore() if settings.ADMISSION_BACKEND == "redis" else None
+)
@@ -1,31 +1,139 @@
 from fastapi import Request, HTTPException
 from app.services.user_service import get_user
+from app.services.user_service import reserve_api_token, QUOTA_ACTIONS
+from app.config import settings
+from app.clients import http_client
+from app.utils import metrics
+from collections import OrderedDict
+from google.auth import jwt as google_jwt
+import asyncio
+import hashlib
+import re
+import time
 import httpx
 
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_TOKENINFO_URL = "https://oauth2.googleapis.com/tokeninfo"
+GOOGLE_ISSUERS = {"accounts.google.com", "https://accounts.google.com"}
+
+_identity_cache = OrderedDict()
+_google_certs = {"certs": None, "expires_at": 0, "refreshed_at": 0}
+_google_certs_lock = asyncio.Lock()
+
 async def authenticate_user(request: Request):
+    user_info = getattr(request.state, "user_info", None)
+    if user_info is not None:
+        return user_info
+
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Missing or invalid auth header")
 
     access_token = auth_header.split(" ")[1]
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://www.googleapis.com/oauth2/v3/userinfo",
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
+    started_at = time.perf_counter()
+    user_info = await get_verified_identity(access_token)
+    metrics.observe("auth_latency_ms", (time.perf_counter() - started_at) * 1000)
 
-    if response.status_code != 200:
-        raise HTTPException(status_code=401, detail="Invalid access token")
-
-    user_info = response.json()
     email = user_info.get("email")
     if not email:
         raise HTTPException(status_code=401, detail="Email not found in user info")
 
     request.state.user_email = email
+    request.state.user_info = user_info
+    return user_info
+
+async def get_verified_identity(token: str):
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    now = time.time()
+
+    cached = _identity_cache.get(key)
+    if cached and cached[1] > now:
+        _identity_cache.move_to_end(key)
+        metrics.increment("auth_cache_hits_total")
+        return cached[0]
+
+    metrics.increment("auth_cache_misses_total")
+    if token.count(".") == 2:
+        user_info = await verify_google_id_token(token)
+        metrics.increment("auth_local_verifications_total")
+    else:
+        user_info = await fetch_access_token_info(token)
+        metrics.increment("auth_remote_verifications_total")
+
+    expires_at = min(float(user_info.get("exp") or now), now + settings.AUTH_CACHE_MAX_TTL_SECONDS)
+    if expires_at > now:
+        _identity_cache[key] = (user_info, expires_at)
+        _identity_cache.move_to_end(key)
+        while len(_identity_cache) > settings.AUTH_CACHE_MAX_ENTRIES:
+            _identity_cache.popitem(last=False)
+
+    return user_info
+
+def has_fresh_google_certs(force_refresh: bool) -> bool:
+    if not _google_certs["certs"]:
+        return False
+    now = time.time()
+    if force_refresh:
+        # Any token can name an unknown key id, so forced refreshes are rate limited.
+        return now - _google_certs["refreshed_at"] < settings.AUTH_CERTS_MIN_REFRESH_SECONDS
+    return now < _google_certs["expires_at"]
+
+async def get_google_certs(force_refresh: bool = False):
+    if has_fresh_google_certs(force_refresh):
+        return _google_certs["certs"]
+
+    async with _google_certs_lock:
+        if has_fresh_google_certs(force_refresh):
+            return _google_certs["certs"]
+
+        try:
+            response = await http_client.get(GOOGLE_CERTS_URL)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            metrics.increment("auth_certs_fetch_errors_total")
+            print(f"Google certs can not be fetched: {e}")
+            raise HTTPException(status_code=503, detail="Authentication is temporarily unavailable")
+        max_age = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+        _google_certs["certs"] = response.json()
+        _google_certs["refreshed_at"] = time.time()
+        _google_certs["expires_at"] = _google_certs["refreshed_at"] + (int(max_age.group(1)) if max_age else 3600)
+        return _google_certs["certs"]
+
+async def verify_google_id_token(token: str):
+    certs = await get_google_certs()
+    try:
+        try:
+            claims = google_jwt.decode(token, certs=certs, audience=settings.GOOGLE_CLIENT_ID, clock_skew_in_seconds=10)
+        except ValueError as e:
+            # Google rotates its signing keys; refresh once when the token names an unknown key id.
+            if "key id" not in str(e):
+                raise
+            certs = await get_google_certs(force_refresh=True)
+            claims = google_jwt.decode(token, certs=certs, audience=settings.GOOGLE_CLIENT_ID, clock_skew_in_seconds=10)
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid access token")
+
+    if claims.get("iss") not in GOOGLE_ISSUERS or not claims.get("email_verified", True):
+        raise HTTPException(status_code=401, detail="Invalid access token")
+
+    return claims
+
+async def fetch_access_token_info(token: str):
+    try:
+        response = await http_client.get(GOOGLE_TOKENINFO_URL, params={"access_token": token})
+    except httpx.HTTPError as e:
+        print(f"Google token info can not be fetched: {e}")
+        raise HTTPException(status_code=503, detail="Authentication is temporarily unavailable")
+
+    if response.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid access token")
+
+    user_info = response.json()
+    if not user_info.get("exp") and user_info.get("expires_in"):
+        user_info["exp"] = int(time.time()) + int(user_info["expires_in"])
     return user_info
-    
+
 async def ensure_authorised_access(action: str, email: str):
     user = await get_user(email)
     if user is None:
@@ -38,6 +146,19 @@ async def ensure_authorised_access(action: str, email: str):
         )
 
     check_token_allowance(user, action)
+    return user
+
+async def reserve_authorised_access(action: str, email: str):
+    if action not in QUOTA_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid action: {action}")
+
+    reservation = await reserve_api_token(email, action)
+    if reservation is None:
+        # Only the rejection path reads the user again, to report why access was refused.
+        await ensure_authorised_access(action, email)
+        raise HTTPException(status_code=401, detail=f"{action.capitalize()} API Tokens plan allowance exceeded.")
+
+    return reservation
 
 def check_token_allowance(user: object, action: str):
     def check_analyze():
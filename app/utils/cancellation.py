@@ -0,0 +1,26 @@
+import asyncio
+from fastapi import Request
+from app.utils import metrics
+
+class ClientDisconnected(Exception):
+    pass
+
+async def run_until_disconnected(request: Request, awaitable, poll_interval_ms: int = 250):
+    """Runs the awaitable as a task and cancels it as soon as the client goes away."""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval_ms / 1000)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                metrics.increment("client_disconnects_total")
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
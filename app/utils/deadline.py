@@ -0,0 +1,22 @@
+import asyncio
+import math
+import time
+from typing import Optional
+
+class Deadline:
+    """Wall-clock budget for a request. A deadline without a budget never expires."""
+
+    def __init__(self, budget_ms: Optional[int] = None):
+        self.enabled = budget_ms is not None and budget_ms > 0
+        self.expires_at = time.monotonic() + budget_ms / 1000 if self.enabled else math.inf
+
+    def remaining(self, reserve_ms: int = 0) -> float:
+        if not self.enabled:
+            return math.inf
+        return max(0.0, self.expires_at - time.monotonic() - reserve_ms / 1000)
+
+    def timeout(self, reserve_ms: int = 0) -> Optional[float]:
+        return self.remaining(reserve_ms) if self.enabled else None
+
+    async def run(self, awaitable, reserve_ms: int = 0):
+        return await asyncio.wait_for(awaitable, self.timeout(reserve_ms))
@@ -0,0 +1,88 @@
+import math
+import re
+from collections import Counter
+from typing import List, Optional, Pattern
+
+SENTENCE_SPLIT_REGEX = re.compile(r"(?<=[.!?])\s+")
+WORD_REGEX = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "had", "has", "have",
+    "i", "in", "is", "it", "its", "of", "on", "or", "our", "so", "that", "the", "their", "them",
+    "they", "this", "to", "was", "we", "were", "which", "with", "you", "your"
+}
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in WORD_REGEX.findall(text.lower()) if word not in STOPWORDS and len(word) > 1]
+
+def strip_prompts(text: str, prompt_regex: Optional[Pattern] = None) -> str:
+    # Review fields interleave the questionnaire prompts with the answers; only answers are kept.
+    if not text or prompt_regex is None:
+        return text or ""
+    return prompt_regex.sub(" ", text)
+
+def split_sentences(text: str) -> List[str]:
+    # Prompts that strip_prompts does not know still end in "?" and are dropped here.
+    return [
+        sentence.strip()
+        for sentence in SENTENCE_SPLIT_REGEX.split(text or "")
+        if len(sentence.strip()) > 20 and not sentence.strip().endswith("?")
+    ]
+
+def cosine(a: dict, b: dict) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(weight * b.get(term, 0) for term, weight in a.items())
+    if not dot:
+        return 0.0
+    norm_a = math.sqrt(sum(weight * weight for weight in a.values()))
+    norm_b = math.sqrt(sum(weight * weight for weight in b.values()))
+    return dot / (norm_a * norm_b)
+
+def rank_sentences(sentences: List[str], query: str = "", damping: float = 0.85, iterations: int = 30) -> List[float]:
+    """Query-biased TextRank over TF-IDF sentence vectors."""
+    if not sentences:
+        return []
+
+    tokens = [tokenize(sentence) for sentence in sentences]
+    document_frequency = Counter(term for sentence_tokens in tokens for term in set(sentence_tokens))
+    count = len(sentences)
+    vectors = [
+        {term: tf * math.log(1 + count / document_frequency[term]) for term, tf in Counter(sentence_tokens).items()}
+        for sentence_tokens in tokens
+    ]
+
+    weights = [[cosine(vectors[i], vectors[j]) if i != j else 0.0 for j in range(count)] for i in range(count)]
+    out_weights = [sum(row) for row in weights]
+
+    query_terms = set(tokenize(query))
+    bias = [1 + len(query_terms.intersection(sentence_tokens)) for sentence_tokens in tokens]
+    bias_total = sum(bias)
+    teleport = [value / bias_total for value in bias]
+
+    scores = teleport[:]
+    for _ in range(iterations):
+        scores = [
+            (1 - damping) * teleport[i] + damping * sum(
+                weights[j][i] / out_weights[j] * scores[j] for j in range(count) if out_weights[j]
+            )
+            for i in range(count)
+        ]
+
+    return scores
+
+def extract_sentences(text: str, query: str = "", max_sentences: int = 2, prompt_regex: Optional[Pattern] = None) -> str:
+    sentences = split_sentences(strip_prompts(text, prompt_regex))
+    if len(sentences) <= max_sentences:
+        return " ".join(sentences)
+
+    scores = rank_sentences(sentences, query)
+    selected = sorted(sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)[:max_sentences])
+    return " ".join(sentences[i] for i in selected)
+
+def extract_review(review: dict, query: str = "", max_sentences: int = 2, prompt_regexes: Optional[dict] = None) -> dict:
+    """Keeps the top sentences of each content field; prompt_regexes maps a field to its questionnaire prompts."""
+    prompt_regexes = prompt_regexes or {}
+    return {
+        key: extract_sentences(value, query, max_sentences, prompt_regexes.get(key)) if key.startswith("content_") else value
+        for key, value in review.items()
+    }
@@ -0,0 +1,52 @@
+import re
+from typing import List, Optional
+
+CONTENT_LABEL_KEYS = {
+    "BACKGROUND": "background",
+    "OPPORTUNITY / CHALLENGE": "challenge",
+    "SOLUTION": "solution",
+    "RESULTS & FEEDBACK": "feedback"
+}
+KEYWORD_TERMS_FIELD = "keywordTerms"
+WORD_REGEX = re.compile(r"\w+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "had", "has", "have",
+    "i", "in", "is", "it", "its", "of", "on", "or", "our", "so", "that", "the", "their", "them",
+    "they", "this", "to", "was", "we", "were", "which", "with", "you", "your"
+}
+
+def normalize_terms(text: str) -> List[str]:
+    return [word for word in WORD_REGEX.findall((text or "").casefold()) if len(word) > 1 and word not in STOPWORDS]
+
+def review_terms(review: dict) -> List[str]:
+    """Sorted "label:term" entries for every indexed word of a review's content sections."""
+    terms = set()
+    for content in review.get("content") or []:
+        label = CONTENT_LABEL_KEYS.get(content.get("label"))
+        if label:
+            terms.update(f"{label}:{term}" for term in normalize_terms(content.get("text")))
+    return sorted(terms)
+
+def with_review_terms(profile: dict) -> dict:
+    if not profile.get("reviews"):
+        return profile
+    return {
+        **profile,
+        "reviews": [{**review, KEYWORD_TERMS_FIELD: review_terms(review)} for review in profile["reviews"]]
+    }
+
+def keyword_clause(label: str, keyword: str) -> Optional[dict]:
+    """Index-servable superset of the reviews whose label section contains the keyword.
+
+    Every word of the keyword must start an indexed term. Anchored, case-sensitive prefix
+    regexes become index range scans. Returns None when no word of the keyword is indexed,
+    since such a keyword can not narrow the candidates.
+    """
+    terms = normalize_terms(keyword)
+    if not terms:
+        return None
+    clauses = [
+        {f"reviews.{KEYWORD_TERMS_FIELD}": re.compile("^" + re.escape(f"{CONTENT_LABEL_KEYS[label]}:{term}"))}
+        for term in terms
+    ]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
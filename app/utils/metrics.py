@@ -0,0 +1,77 @@
+import threading
+from bisect import bisect_left
+
+LATENCY_MS_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+TOKEN_BUCKETS = (0, 100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+COST_BUCKETS = (10, 100, 1000, 10000, 50000, 100000, 250000, 1000000)
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_histograms = {}
+
+def increment(name: str, value: float = 1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def set_gauge(name: str, value: float):
+    with _lock:
+        _gauges[name] = value
+
+def observe(name: str, value: float, buckets: tuple = LATENCY_MS_BUCKETS):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = {
+                "buckets": buckets,
+                "counts": [0] * (len(buckets) + 1),
+                "count": 0,
+                "sum": 0.0,
+                "min": None,
+                "max": None
+            }
+            _histograms[name] = histogram
+
+        histogram["counts"][bisect_left(histogram["buckets"], value)] += 1
+        histogram["count"] += 1
+        histogram["sum"] += value
+        histogram["min"] = value if histogram["min"] is None else min(histogram["min"], value)
+        histogram["max"] = value if histogram["max"] is None else max(histogram["max"], value)
+
+def get_counter(name: str) -> float:
+    with _lock:
+        return _counters.get(name, 0)
+
+def get_histogram_avg(name: str) -> float:
+    with _lock:
+        histogram = _histograms.get(name)
+        if not histogram or not histogram["count"]:
+            return 0
+        return histogram["sum"] / histogram["count"]
+
+def snapshot() -> dict:
+    with _lock:
+        histograms = {}
+        for name, histogram in _histograms.items():
+            labels = [f"le_{bound}" for bound in histogram["buckets"]] + ["le_inf"]
+            histograms[name] = {
+                "count": histogram["count"],
+                "sum": histogram["sum"],
+                "avg": histogram["sum"] / histogram["count"] if histogram["count"] else 0,
+                "min": histogram["min"],
+                "max": histogram["max"],
+                "buckets": dict(zip(labels, histogram["counts"]))
+            }
+
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "histograms": histograms
+        }
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
@@ -0,0 +1,85 @@
+import hashlib
+import random
+import re
+from typing import Callable, List, Tuple
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 61) - 1
+REVIEW_CONTENT_FIELDS = [
+    "content_background",
+    "content_opportunity_challenge",
+    "content_solution",
+    "content_results_feedback"
+]
+
+# Fixed seed so signatures computed at ingest and at query time are comparable.
+_random = random.Random(20240501)
+PERMUTATIONS = [
+    (_random.randrange(1, MERSENNE_PRIME), _random.randrange(0, MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+WORD_REGEX = re.compile(r"[a-z0-9]+")
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    words = WORD_REGEX.findall((text or "").lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def signature(text: str) -> List[int]:
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for shingle in shingles(text)
+    ]
+    if not hashes:
+        return [MAX_HASH] * NUM_PERMUTATIONS
+    return [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in PERMUTATIONS]
+
+def review_text(review: dict) -> str:
+    return " ".join(review.get(field) or "" for field in REVIEW_CONTENT_FIELDS)
+
+def review_signature(review: dict) -> List[int]:
+    return signature(review_text(review))
+
+def similarity(a: List[int], b: List[int]) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERMUTATIONS
+
+def collapse_duplicates(items: list, get_signature: Callable[[dict], List[int]], threshold: float = 0.8) -> Tuple[list, list]:
+    """Keeps the first item of every group of near-duplicates, preserving rank order.
+
+    Candidates are found with LSH banding and confirmed with the estimated Jaccard similarity.
+    Items whose signature is None are kept without being compared. Returns the
+    representatives and the collapsed duplicates.
+    """
+    buckets = {}
+    signatures = []
+    representatives = []
+    duplicates = []
+
+    for item in items:
+        item_signature = get_signature(item)
+        if item_signature is None:
+            representatives.append(item)
+            continue
+        bands = [
+            (band, tuple(item_signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]))
+            for band in range(BANDS)
+        ]
+        candidates = {index for key in bands for index in buckets.get(key, ())}
+
+        if any(similarity(item_signature, signatures[index]) >= threshold for index in candidates):
+            duplicates.append(item)
+            continue
+
+        index = len(signatures)
+        signatures.append(item_signature)
+        representatives.append(item)
+        for key in bands:
+            buckets.setdefault(key, []).append(index)
+
+    return representatives, duplicates
@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import json
+import time
+import bson
+from collections import OrderedDict
+from typing import Awaitable, Callable
+from app.config import settings
+from app.utils import metrics
+
+def normalize_arguments(arguments: dict) -> dict:
+    """Drops unset arguments and sorts list values, so equivalent argument sets share a key."""
+    normalized = {}
+    for key, value in arguments.items():
+        if isinstance(value, dict):
+            value = normalize_arguments(value)
+        elif isinstance(value, list):
+            value = sorted(value, key=str)
+        if value is None or value is False or value == [] or value == {}:
+            continue
+        normalized[key] = value
+    return normalized
+
+class ResultCache:
+    """Caches read results in process and, when a Redis client is given, in Redis.
+
+    Keys carry a generation number. invalidate() moves every process to a new generation
+    (INCR and PUBLISH on Redis), so older entries are never read again and age out by TTL.
+    A result computed while an invalidation happened is returned but not cached.
+    """
+
+    def __init__(self, name: str, max_entries: int = 500, ttl_seconds: int = 600, redis_client=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis = redis_client
+        self.generation_key = f"result_cache:{name}:generation"
+        self.channel = f"result_cache:{name}:invalidations"
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._task = None
+
+    def key(self, arguments: dict) -> str:
+        payload = json.dumps(normalize_arguments(arguments), sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get_or_set(self, arguments: dict, compute: Callable[[], Awaitable]):
+        generation = self.generation
+        key = f"{generation}:{self.key(arguments)}"
+
+        cached = self._entries.get(key)
+        if cached and cached[1] > time.time():
+            self._entries.move_to_end(key)
+            metrics.increment(f"result_cache_hits_total:{self.name}")
+            return cached[0]
+
+        # Concurrent misses for the same key share one computation.
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, generation, compute))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def get(self, arguments: dict):
+        """Returns the cached result, or None, without computing anything."""
+        key = f"{self.generation}:{self.key(arguments)}"
+        cached = self._entries.get(key)
+        if cached and cached[1] > time.time():
+            self._entries.move_to_end(key)
+            metrics.increment(f"result_cache_hits_total:{self.name}")
+            return cached[0]
+
+        value = await self._get_shared(key)
+        if value is None:
+            metrics.increment(f"result_cache_misses_total:{self.name}")
+            return None
+        metrics.increment(f"result_cache_shared_hits_total:{self.name}")
+        self._store(key, value)
+        return value
+
+    async def set(self, arguments: dict, value):
+        key = f"{self.generation}:{self.key(arguments)}"
+        await self._set_shared(key, value)
+        self._store(key, value)
+
+    async def _load(self, key: str, generation: int, compute: Callable[[], Awaitable]):
+        value = await self._get_shared(key)
+        if value is None:
+            metrics.increment(f"result_cache_misses_total:{self.name}")
+            value = await compute()
+            if generation == self.generation:
+                await self._set_shared(key, value)
+        else:
+            metrics.increment(f"result_cache_shared_hits_total:{self.name}")
+
+        if generation == self.generation:
+            self._store(key, value)
+        return value
+
+    def _store(self, key: str, value):
+        self._entries[key] = (value, time.time() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _get_shared(self, key: str):
+        if self.redis is None:
+            return None
+        try:
+            data = await self.redis.get(f"result_cache:{self.name}:{key}")
+        except Exception:
+            metrics.increment(f"result_cache_redis_errors_total:{self.name}")
+            return None
+        return bson.decode(data)["value"] if data is not None else None
+
+    async def _set_shared(self, key: str, value):
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(f"result_cache:{self.name}:{key}", bson.encode({"value": value}), ex=self.ttl_seconds)
+        except Exception:
+            metrics.increment(f"result_cache_redis_errors_total:{self.name}")
+
+    def apply_generation(self, generation: int):
+        if generation != self.generation:
+            self.generation = generation
+            self._entries.clear()
+
+    async def invalidate(self):
+        metrics.increment(f"result_cache_invalidations_total:{self.name}")
+        if self.redis is None:
+            self.apply_generation(self.generation + 1)
+            return
+
+        self._entries.clear()
+        try:
+            generation = await self.redis.incr(self.generation_key)
+            await self.redis.publish(self.channel, generation)
+            self.apply_generation(generation)
+        except Exception as e:
+            metrics.increment(f"result_cache_redis_errors_total:{self.name}")
+            print(f"Result cache {self.name} can not be invalidated in Redis: {e}")
+
+    def start(self):
+        if self.redis is not None and self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def run(self):
+        """Follows invalidations published by other processes, such as the scraper tasks."""
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    self.apply_generation(int(await self.redis.get(self.generation_key) or 0))
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.apply_generation(int(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Invalidations may have been missed while disconnected.
+                self._entries.clear()
+                metrics.increment(f"result_cache_redis_errors_total:{self.name}")
+                print(f"Result cache {self.name} lost its invalidation subscription: {e}")
+                await asyncio.sleep(1)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+def build_result_cache(name: str, max_entries: int, ttl_seconds: int) -> ResultCache:
+    redis_client = None
+    if settings.RESULT_CACHE_BACKEND == "redis":
+        import redis.asyncio as redis
+        redis_client = redis.Redis(host=settings.REDIS_HOST, port=int(settings.REDIS_PORT), db=int(settings.REDIS_DB))
+    return ResultCache(name, max_entries, ttl_seconds, redis_client)
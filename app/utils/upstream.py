@@ -0,0 +1,214 @@
+import asyncio
+import inspect
+import random
+import time
+from email.utils import parsedate_to_datetime
+from app.utils import metrics
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Refills `per_minute` units evenly over a minute, holding at most one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay_for(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def drain(self):
+        self._refill()
+        self.tokens = min(self.tokens, 0)
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limiter: halves the limit on throttling and grows it back by one per window of successes."""
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 64):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, throttled: bool = False):
+        async with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+class UpstreamLane:
+    def __init__(self, rpm: float = None, tpm: float = None, concurrency: int = 16, min_concurrency: int = 1, max_concurrency: int = 64):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.limiter = AdaptiveConcurrencyLimiter(concurrency, min_concurrency, max_concurrency)
+        self._lock = asyncio.Lock()
+
+    async def reserve(self, tokens: int):
+        async with self._lock:
+            while True:
+                delay = max(
+                    self.requests.delay_for(1) if self.requests else 0,
+                    self.tokens.delay_for(tokens) if self.tokens else 0
+                )
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+
+            if self.requests:
+                self.requests.consume(1)
+            if self.tokens:
+                self.tokens.consume(tokens)
+
+    def settle(self, estimated: int, actual: int):
+        if self.tokens and actual is not None:
+            self.tokens.consume(actual - estimated)
+
+    def throttled(self):
+        if self.requests:
+            self.requests.drain()
+
+class UpstreamScheduler:
+    """Shared gate for calls to OpenAI and Azure Search.
+
+    Each call names a lane (a model, deployment or index). The lane applies its
+    requests-per-minute and tokens-per-minute buckets and adaptive concurrency,
+    and throttled or transient failures are retried with jittered backoff that
+    honours Retry-After.
+    """
+
+    def __init__(self, limits: dict = None, max_retries: int = 4, backoff_base_ms: int = 500, backoff_max_ms: int = 20000,
+                 concurrency: int = 16, min_concurrency: int = 1, max_concurrency: int = 64):
+        self.limits = limits or {}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base_ms / 1000
+        self.backoff_max = backoff_max_ms / 1000
+        self.concurrency = concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self._lanes = {}
+
+    def lane(self, name: str) -> UpstreamLane:
+        lane = self._lanes.get(name)
+        if lane is None:
+            config = self.limits.get(name, {})
+            lane = UpstreamLane(
+                rpm=config.get("rpm"),
+                tpm=config.get("tpm"),
+                concurrency=config.get("concurrency", self.concurrency),
+                min_concurrency=config.get("min_concurrency", self.min_concurrency),
+                max_concurrency=config.get("max_concurrency", self.max_concurrency)
+            )
+            self._lanes[name] = lane
+        return lane
+
+    async def run(self, name: str, fn, *args, tokens: int = 0, **kwargs):
+        lane = self.lane(name)
+        attempt = 0
+        delay = None
+
+        while True:
+            # The backoff is slept without holding a concurrency slot.
+            if delay is not None:
+                await asyncio.sleep(delay)
+            await lane.reserve(tokens)
+            await lane.limiter.acquire()
+            throttled = False
+            started_at = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(fn):
+                    result = await fn(*args, **kwargs)
+                else:
+                    result = await asyncio.to_thread(fn, *args, **kwargs)
+            except Exception as e:
+                status_code = get_status_code(e)
+                throttled = status_code == 429
+                metrics.increment(f"upstream_errors_total:{name}")
+
+                if throttled:
+                    lane.throttled()
+                    metrics.increment(f"upstream_throttled_total:{name}")
+
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+
+                delay = get_retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                attempt += 1
+                metrics.increment(f"upstream_retries_total:{name}")
+                continue
+            finally:
+                await lane.limiter.release(throttled)
+                metrics.set_gauge(f"upstream_concurrency_limit:{name}", int(lane.limiter.limit))
+
+            metrics.observe(f"upstream_latency_ms:{name}", (time.perf_counter() - started_at) * 1000)
+            lane.settle(tokens, get_total_tokens(result))
+            return result
+
+def get_status_code(e: Exception):
+    status_code = getattr(e, "status_code", None)
+    if status_code is None:
+        response = getattr(e, "response", None)
+        status_code = getattr(response, "status_code", None)
+    return status_code
+
+def is_retryable(e: Exception) -> bool:
+    status_code = get_status_code(e)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    name = type(e).__name__
+    return "Timeout" in name or "Connection" in name or name == "ServiceRequestError"
+
+def get_retry_after(e: Exception):
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def get_total_tokens(result):
+    usage = getattr(result, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+def estimate_tokens(*texts: str) -> int:
+    return sum(len(text or "") for text in texts) // 4 + 1
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from app.clients import embedding_client, search_client, completion_client
+from app.config import settings
+from app.db import database
+from app.utils import metrics
+
+WARM_UP_GRAPHQL_QUERY = "{ getProfiles(first: 1) { edges { node { Id summary { name } } } } }"
+
+warm_up_status = {"ready": False, "started_at": None, "finished_at": None, "steps": {}}
+
+async def open_connections():
+    """Opens a pooled connection to every upstream, so the first request skips DNS and TLS."""
+    from app.utils.auth import get_google_certs
+    targets = {
+        "mongo": database.command("ping"),
+        "search": asyncio.to_thread(search_client.get_document_count),
+        "embedding": asyncio.to_thread(embedding_client.models.list),
+        "completion": completion_client.models.list(),
+        "google": get_google_certs()
+    }
+    results = await asyncio.gather(*targets.values(), return_exceptions=True)
+    # A rejected call still leaves its connection in the pool; only the failures are reported.
+    return {name: str(result) for name, result in zip(targets, results) if isinstance(result, Exception)} or None
+
+async def compile_patterns():
+    from app.services.chat_service import compile_question_patterns, REVIEW_QUESTIONS
+    for patterns in REVIEW_QUESTIONS.values():
+        compile_question_patterns(patterns)
+
+async def execute_graphql_query():
+    from app.graphql.schema import schema
+    result = await schema.execute(WARM_UP_GRAPHQL_QUERY)
+    if result.errors:
+        raise result.errors[0]
+
+async def embed_recent_queries():
+    if settings.WARM_UP_RECENT_QUERIES <= 0:
+        return None
+    from app.services.chat_service import embedding_dispatcher
+    from app.services.user_service import get_recent_queries
+    queries = await get_recent_queries(settings.WARM_UP_RECENT_QUERIES, settings.WARM_UP_RECENT_QUERIES_SCAN)
+    await asyncio.gather(*(embedding_dispatcher.embed(query) for query in queries))
+    return {"queries": len(queries)}
+
+WARM_UP_STEPS = {
+    "connections": open_connections,
+    "patterns": compile_patterns,
+    "graphql": execute_graphql_query,
+    "recent_queries": embed_recent_queries
+}
+
+async def run_warm_up_step(name: str):
+    started_at = time.perf_counter()
+    try:
+        details = await WARM_UP_STEPS[name]()
+        status = {"status": "ok", **({"details": details} if details else {})}
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        metrics.increment(f"warm_up_errors_total:{name}")
+        print(f"Warm-up step {name} failed: {e}")
+        status = {"status": "failed", "error": str(e)}
+    status["duration_ms"] = round((time.perf_counter() - started_at) * 1000)
+    metrics.observe(f"warm_up_step_ms:{name}", status["duration_ms"])
+    warm_up_status["steps"][name] = status
+
+async def run_warm_up(steps: list = None):
+    """Runs the configured warm-up steps in order, then reports the worker ready.
+
+    Warm-up is best effort: a failed or timed out step is reported in the status but
+    does not keep the worker out of rotation.
+    """
+    steps = settings.WARM_UP_STEPS if steps is None else steps
+    warm_up_status.update(ready=False, started_at=time.time(), finished_at=None, steps={})
+    try:
+        await asyncio.wait_for(run_warm_up_steps(steps), settings.WARM_UP_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        metrics.increment("warm_up_timeouts_total")
+        print(f"Warm-up did not finish in {settings.WARM_UP_TIMEOUT_SECONDS}s")
+        for name in steps:
+            warm_up_status["steps"].setdefault(name, {"status": "timed_out"})
+    mark_ready()
+
+async def run_warm_up_steps(steps: list):
+    for name in steps:
+        await run_warm_up_step(name)
+
+def mark_ready():
+    warm_up_status.update(ready=True, finished_at=time.time())
+    metrics.set_gauge("warm_up_ready", 1)
@@ -64,6 +64,11 @@ def get_tokens():
             return auth["id_token"], auth["token"]
         return '', auth["token"]
     
+def get_auth_headers():
+    # The API verifies Google id tokens locally; an access token costs it a tokeninfo call.
+    id_token, access_token = get_tokens()
+    return {"Authorization": f"Bearer {id_token or access_token}"}
+
 def refresh_access_token(refresh_token):
     token_url = "https://oauth2.googleapis.com/token"
     payload = {
@@ -103,8 +108,7 @@ if not cookieController.get(AUTH_COOKIE_KEY):
                 "expires_at": result["token"]["expires_at"]
             })
 
-            id_token, access_token = get_tokens()
-            headers = {"Authorization": f"Bearer {access_token}"}
+            headers = get_auth_headers()
             user = requests.get(USER_API_URL, headers=headers)
             if user.status_code == 404:
                 requests.post(USER_REGISTER_API_URL, headers=headers)
@@ -207,10 +211,7 @@ else:
                         if selected_company_sizes:
                             payload["company_sizes"] = selected_company_sizes
 
-                        _, access_token = get_tokens()
-                        headers = {
-                            "Authorization": f"Bearer {access_token}"
-                        }
+                        headers = get_auth_headers()
 
                         response = requests.post(SEARCH_CONTACTS_URL, json=payload, headers=headers)
 
@@ -288,10 +289,7 @@ else:
                             "company_sizes": selected_company_sizes if selected_company_sizes else None
                             #"project_budgets": selected_project_budgets if selected_company_sizes else None
                         }
-                        _, access_token = get_tokens()
-                        headers = {
-                            "Authorization": f"Bearer {access_token}"
-                        }
+                        headers = get_auth_headers()
 
                         analysis_response = requests.post(MARKETING_RESEARCH_URL, json=analysis_payload, headers=headers)
 
@@ -312,8 +310,7 @@ else:
     with tab3:
         st.subheader("📊 Plan & Usage")
 
-        _, access_token = get_tokens()
-        headers = {"Authorization": f"Bearer {access_token}"}
+        headers = get_auth_headers()
         user = requests.get(USER_API_URL, headers=headers)
 
         if user.status_code == 200:
@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings requires these; the tests never reach the services behind them.
+TEST_ENVIRONMENT = {
+    "MONGO_URI": "mongodb://localhost:27017",
+    "MONGO_DB_NAME": "test",
+    "APIFY_API_KEY": "test",
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+    "REDIS_DB": "0",
+    "COMPANY_PROFILE_JSON_MAPPING_QUERY": "test",
+    "SEARCH_INDEX_NAME": "test",
+    "SEARCH_SERVICE_NAME": "test",
+    "VECTOR_SEARCH_DIM": "3",
+    "SEARCH_API_KEY": "test",
+    "SEARCH_ENDPOINT": "https://test.search.windows.net",
+    "EMBEDDING_ENDPOINT": "https://test.openai.azure.com",
+    "EMBEDDING_KEY": "test",
+    "AZURE_COMPLETION_ENDPOINT": "https://test.openai.azure.com",
+    "AZURE_OPENAI_KEY": "test",
+    "EMBEDDING_API_VERSION": "2024-02-15-preview",
+    "COMPLETION_API_VERSION": "2024-02-15-preview",
+    "EMBEDDING_MODEL_NAME": "text-embedding-3-small",
+    "GOOGLE_CLIENT_ID": "test"
+}
+
+for name, value in TEST_ENVIRONMENT.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from app.utils.admission import AdmissionController, AdmissionRejected, LocalAdmissionStore
+
+PLAN_PRIORITIES = {"enterprise": 0, "pro": 1, "free": 2}
+
+def build_controller(**overrides) -> AdmissionController:
+    options = dict(
+        user_limit=1,
+        global_limit=10,
+        queue_timeout_ms=1000,
+        lease_ttl_ms=60000,
+        poll_interval_ms=1000,
+        plan_priorities=PLAN_PRIORITIES
+    )
+    options.update(overrides)
+    return AdmissionController(LocalAdmissionStore(), name="test", **options)
+
+def test_user_limit_rejects_only_that_user():
+    async def main():
+        controller = build_controller(queue_timeout_ms=50)
+        await controller.acquire("a@example.com", "pro")
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("a@example.com", "pro")
+        lease = await controller.acquire("b@example.com", "pro")
+        assert lease["email"] == "b@example.com"
+
+    asyncio.run(main())
+
+def test_release_admits_queued_request_before_the_next_poll():
+    async def main():
+        controller = build_controller(global_limit=1)
+        lease = await controller.acquire("a@example.com", "pro")
+        queued = asyncio.ensure_future(controller.acquire("b@example.com", "pro"))
+        await asyncio.sleep(0.01)
+        assert not queued.done()
+
+        await controller.release(lease)
+        queued_lease = await asyncio.wait_for(queued, 0.2)
+        assert queued_lease["email"] == "b@example.com"
+
+    asyncio.run(main())
+
+def test_higher_plan_is_admitted_first():
+    async def main():
+        controller = build_controller(global_limit=1)
+        lease = await controller.acquire("a@example.com", "pro")
+        free = asyncio.ensure_future(controller.acquire("free@example.com", "free"))
+        await asyncio.sleep(0.01)
+        enterprise = asyncio.ensure_future(controller.acquire("enterprise@example.com", "enterprise"))
+        await asyncio.sleep(0.01)
+
+        await controller.release(lease)
+        enterprise_lease = await asyncio.wait_for(enterprise, 0.2)
+        assert not free.done()
+
+        await controller.release(enterprise_lease)
+        free_lease = await asyncio.wait_for(free, 0.2)
+        assert free_lease["email"] == "free@example.com"
+
+    asyncio.run(main())
+
+def test_expired_lease_frees_its_slot():
+    async def main():
+        controller = build_controller(lease_ttl_ms=20, queue_timeout_ms=0)
+        await controller.acquire("a@example.com", "pro")
+        await asyncio.sleep(0.03)
+        lease = await controller.acquire("a@example.com", "pro")
+        assert lease["email"] == "a@example.com"
+
+    asyncio.run(main())
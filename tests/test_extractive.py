@@ -0,0 +1,36 @@
+from app.services.chat_service import REVIEW_QUESTIONS, get_prompt_regexes
+from app.utils.extractive import extract_review
+
+REVIEW = {
+    "reviewer_name": "Acme",
+    "content_background": (
+        "Please describe your company and your position there. "
+        "I am the CTO of a logistics startup that routes freight across Europe. "
+        "Describe what your company does in a single sentence. "
+        "We build route planning software for mid-sized carriers and their dispatchers."
+    ),
+    "content_results_feedback": (
+        "What did you find most impressive about them? "
+        "Their engineers shipped the Kafka pipeline two weeks ahead of schedule. "
+        "Describe their project management style, including communication tools and timeliness. "
+        "We met weekly on Zoom and tracked every task in Jira without surprises."
+    )
+}
+
+def test_extract_review_drops_questionnaire_prompts():
+    extract = extract_review(REVIEW, "kafka logistics", 2, get_prompt_regexes())
+
+    for field, patterns in REVIEW_QUESTIONS.items():
+        for prompt in patterns:
+            assert prompt not in extract.get(field, "")
+    assert "logistics startup" in extract["content_background"]
+    assert "Kafka pipeline" in extract["content_results_feedback"]
+    assert extract["reviewer_name"] == "Acme"
+
+def test_extract_review_keeps_answers_when_fields_fit():
+    extract = extract_review(REVIEW, "", 2, get_prompt_regexes())
+
+    assert extract["content_background"] == (
+        "I am the CTO of a logistics startup that routes freight across Europe. "
+        "We build route planning software for mid-sized carriers and their dispatchers."
+    )
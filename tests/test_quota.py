@@ -0,0 +1,114 @@
+import asyncio
+import copy
+import pytest
+from bson import ObjectId
+from app.config import settings
+from app.services import user_service
+
+def evaluate(expression, document: dict):
+    """The subset of aggregation expressions used by the quota updates."""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return document.get(expression[1:])
+    if isinstance(expression, dict):
+        (operator, arguments), = expression.items()
+        values = [evaluate(argument, document) for argument in arguments]
+        if operator == "$gt":
+            return values[0] > values[1]
+        if operator == "$min":
+            return min(values)
+        if operator == "$add":
+            return sum(values)
+        raise NotImplementedError(operator)
+    return expression
+
+class FakeUsers:
+    def __init__(self, *documents):
+        self.documents = [dict(document, _id=ObjectId()) for document in documents]
+        self.calls = 0
+
+    def match(self, query: dict):
+        for document in self.documents:
+            if document["email"] != query["email"]:
+                continue
+            if "$expr" in query and not evaluate(query["$expr"], document):
+                continue
+            return document
+        return None
+
+    def apply(self, document: dict, update):
+        if isinstance(update, list):
+            for stage in update:
+                document.update({field: evaluate(value, document) for field, value in stage["$set"].items()})
+        else:
+            for field, value in update["$inc"].items():
+                document[field] = document.get(field, 0) + value
+
+    async def find_one_and_update(self, query: dict, update, return_document=None):
+        self.calls += 1
+        document = self.match(query)
+        if document is None:
+            return None
+        before = copy.deepcopy(document)
+        self.apply(document, update)
+        return before
+
+    async def update_one(self, query: dict, update: dict):
+        self.calls += 1
+        document = self.match(query)
+        if document is not None:
+            self.apply(document, update)
+
+    async def bulk_write(self, operations: list, ordered: bool = True):
+        self.calls += 1
+        for operation in operations:
+            await self.update_one(operation._filter, operation._doc)
+
+@pytest.fixture
+def users(monkeypatch):
+    users = FakeUsers({"email": "a@example.com", "api_tokens_search_allocated": 3, "api_tokens_search_used": 1})
+    monkeypatch.setattr(user_service, "users", users)
+    monkeypatch.setattr(user_service, "_quota_leases", {})
+    return users
+
+def test_reserve_counts_usage_until_allocation_is_spent(users, monkeypatch):
+    monkeypatch.setattr(settings, "QUOTA_LEASE_SIZE", 1)
+
+    async def main():
+        first = await user_service.reserve_api_token("a@example.com", "search")
+        second = await user_service.reserve_api_token("a@example.com", "search")
+        third = await user_service.reserve_api_token("a@example.com", "search")
+        return first, second, third
+
+    first, second, third = asyncio.run(main())
+    assert first["email"] == "a@example.com" and first["action"] == "search"
+    assert second is not None
+    assert third is None
+    assert users.documents[0]["api_tokens_search_used"] == 3
+
+def test_release_returns_the_token(users, monkeypatch):
+    monkeypatch.setattr(settings, "QUOTA_LEASE_SIZE", 1)
+
+    async def main():
+        reservation = await user_service.reserve_api_token("a@example.com", "search")
+        await user_service.release_api_token(reservation)
+
+    asyncio.run(main())
+    assert users.documents[0]["api_tokens_search_used"] == 1
+
+def test_lease_serves_reservations_locally_and_flush_returns_the_rest(users, monkeypatch):
+    monkeypatch.setattr(settings, "QUOTA_LEASE_SIZE", 5)
+
+    async def main():
+        first = await user_service.reserve_api_token("a@example.com", "search")
+        second = await user_service.reserve_api_token("a@example.com", "search")
+        assert users.calls == 1
+        # The lease was capped at the two tokens left, so the allowance is now spent.
+        assert await user_service.reserve_api_token("a@example.com", "search") is None
+        await user_service.release_api_token(second)
+        assert users.documents[0]["api_tokens_search_used"] == 3
+        await user_service.flush_quota_leases(force=True)
+        return first
+
+    first = asyncio.run(main())
+    assert first["user"]["email"] == "a@example.com"
+    assert users.documents[0]["api_tokens_search_used"] == 2
@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from bson import ObjectId
+from app.services import company_profile_service
+from app.services.company_profile_service import search_profiles
+
+class FakeCursor:
+    def __init__(self, documents: list):
+        self.documents = documents
+
+    def sort(self, field: str, direction: int):
+        self.documents = sorted(self.documents, key=lambda document: document[field], reverse=direction < 0)
+        return self
+
+    def limit(self, limit: int):
+        self.documents = self.documents[:limit]
+        return self
+
+    async def to_list(self, length=None):
+        return self.documents
+
+class FakeProfiles:
+    def __init__(self, count: int):
+        self.documents = [{"_id": ObjectId(), "summary": {"name": f"Company {index}"}} for index in range(count)]
+        self.pipelines = []
+
+    def find(self, query: dict, projection=None):
+        after = query.get("_id", {}).get("$gt")
+        return FakeCursor([document for document in self.documents if after is None or document["_id"] > after])
+
+    def aggregate(self, pipeline: list):
+        self.pipelines.append(pipeline)
+        return FakeCursor([])
+
+@pytest.fixture
+def profiles(monkeypatch):
+    profiles = FakeProfiles(5)
+    monkeypatch.setattr(company_profile_service, "company_profiles", profiles)
+    return profiles
+
+def test_pages_follow_the_cursor_without_gaps_or_repeats(profiles):
+    async def main():
+        pages, after = [], None
+        while True:
+            page = await search_profiles(after=after, limit=2)
+            if not page:
+                return pages
+            pages.append([profile["_id"] for profile in page])
+            after = str(page[-1]["_id"])
+
+    pages = asyncio.run(main())
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [profile_id for page in pages for profile_id in page] == sorted(document["_id"] for document in profiles.documents)
+
+def test_filtered_page_starts_after_the_cursor_in_id_order(profiles):
+    after = profiles.documents[1]["_id"]
+    asyncio.run(search_profiles(min_reviews=1, after=str(after), limit=3, projection={"summary": 1}))
+
+    pipeline, = profiles.pipelines
+    assert pipeline[0]["$match"]["_id"] == {"$gt": after}
+    assert pipeline[1] == {"$sort": {"_id": 1}}
+    assert pipeline[-2:] == [{"$limit": 3}, {"$project": {"summary": 1}}]
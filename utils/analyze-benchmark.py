@@ -0,0 +1,38 @@
+import asyncio
+import time
+from app.services.chat_service import analyze
+from app.utils import metrics
+
+QUERIES = [
+    "What are the biggest challenges companies are trying to solve via web scraping in marketing?",
+    "How do B2B companies use web scraping to identify new leads?",
+    "What role does web scraping play in pricing strategy development?",
+    "How do marketing teams integrate scraped data with CRM platforms?",
+    "What are the key technical challenges in implementing web scraping at scale?"
+]
+
+async def run_mode(mode: str):
+    latencies = []
+    prompt_tokens = metrics.get_counter("completion_prompt_tokens_total")
+    output_tokens = metrics.get_counter("completion_output_tokens_total")
+
+    for query in QUERIES:
+        started_at = time.perf_counter()
+        await analyze(query, "2018-01-01T00:00:00Z", None, None, None, mode=mode)
+        latencies.append(time.perf_counter() - started_at)
+
+    prompt_tokens = metrics.get_counter("completion_prompt_tokens_total") - prompt_tokens
+    output_tokens = metrics.get_counter("completion_output_tokens_total") - output_tokens
+    latencies.sort()
+    print(
+        f"{mode:>10}: avg {sum(latencies) / len(latencies):.2f}s, "
+        f"p50 {latencies[len(latencies) // 2]:.2f}s, max {latencies[-1]:.2f}s, "
+        f"prompt tokens/query {prompt_tokens / len(QUERIES):.0f}, "
+        f"output tokens/query {output_tokens / len(QUERIES):.0f}"
+    )
+
+async def main():
+    for mode in ["llm", "extractive"]:
+        await run_mode(mode)
+
+asyncio.run(main())
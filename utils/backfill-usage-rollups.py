@@ -0,0 +1,39 @@
+import asyncio
+from app.db import user_requests
+from app.indexes import ensure_collection_indexes, INDEXES
+from app.services.user_service import USAGE_ROLLUP_GRANULARITIES
+
+# Rebuilds the rollups from the raw log and replaces the existing ones, so it is run
+# while no requests are being logged, e.g. before enabling USAGE_ROLLUPS_ENABLED.
+async def main():
+    await ensure_collection_indexes(user_requests.database["user_usage_rollups"], INDEXES["user_usage_rollups"])
+    for granularity in USAGE_ROLLUP_GRANULARITIES:
+        await user_requests.aggregate([
+            {"$group": {
+                "_id": {
+                    "email": "$email",
+                    "granularity": granularity,
+                    "bucketStart": {"$dateTrunc": {"date": "$createdAt", "unit": granularity}},
+                    "request_type": "$request_type"
+                },
+                "count": {"$sum": 1},
+                "latency_ms_count": {"$sum": {"$cond": [{"$ne": [{"$type": "$latency_ms"}, "missing"]}, 1, 0]}},
+                "latency_ms_sum": {"$sum": "$latency_ms"},
+                "latency_ms_max": {"$max": {"$ifNull": ["$latency_ms", 0]}}
+            }},
+            {"$replaceWith": {"$mergeObjects": ["$_id", {
+                "count": "$count",
+                "latency_ms_count": "$latency_ms_count",
+                "latency_ms_sum": "$latency_ms_sum",
+                "latency_ms_max": "$latency_ms_max"
+            }]}},
+            {"$merge": {
+                "into": "user_usage_rollups",
+                "on": ["email", "granularity", "bucketStart", "request_type"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }}
+        ]).to_list(length=None)
+        print(f"{granularity} rollups rebuilt")
+
+asyncio.run(main())
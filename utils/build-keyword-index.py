@@ -0,0 +1,40 @@
+import asyncio
+from pymongo import UpdateOne
+from app.db import company_profiles
+from app.indexes import ensure_collection_indexes, COMPANY_PROFILE_INDEXES
+from app.utils.keyword_index import review_terms, KEYWORD_TERMS_FIELD
+
+BATCH_SIZE = 500
+
+async def main():
+    """Backfills review keyword terms for profiles ingested before the index existed.
+
+    Run once before setting REVIEW_KEYWORD_INDEX_ENABLED; profiles without terms would
+    otherwise never match the keyword filters.
+    """
+    await ensure_collection_indexes(company_profiles, COMPANY_PROFILE_INDEXES)
+    updated = 0
+    operations = []
+    projection = {"reviews.content": 1, f"reviews.{KEYWORD_TERMS_FIELD}": 1}
+    async for profile in company_profiles.find({"reviews.0": {"$exists": True}}, projection):
+        for index, review in enumerate(profile["reviews"]):
+            terms = review_terms(review)
+            if review.get(KEYWORD_TERMS_FIELD) == terms:
+                continue
+            # Only this review's terms are written, and only while the review at this position
+            # still has the content they were computed from, so concurrent writes to the
+            # profile (e.g. LinkedIn enrichment) are never overwritten.
+            operations.append(UpdateOne(
+                {"_id": profile["_id"], f"reviews.{index}.content": review.get("content")},
+                {"$set": {f"reviews.{index}.{KEYWORD_TERMS_FIELD}": terms}}
+            ))
+        if len(operations) >= BATCH_SIZE:
+            updated += (await company_profiles.bulk_write(operations, ordered=False)).modified_count
+            operations = []
+            print(f"{updated} reviews indexed")
+
+    if operations:
+        updated += (await company_profiles.bulk_write(operations, ordered=False)).modified_count
+    print(f"Done, {updated} reviews indexed")
+
+asyncio.run(main())
@@ -1,6 +1,7 @@
 import re
 import datetime
 from app.db import reviews_with_embeddings, reviews_structured
+from app.utils.minhash import review_signature
 
 def parse_reviewer_title(title):
     title = title.strip()
@@ -142,6 +143,7 @@ async def process_reviews():
             "embeddings": doc["embeddings"],
             "tags": tags
         }
+        structured_doc["minhash"] = review_signature(structured_doc)
 
         structured_data.append(structured_doc)
 
@@ -0,0 +1,89 @@
+import asyncio
+import random
+import time
+import tracemalloc
+from app.db import database
+import app.graphql.types as types
+import app.services.company_profile_service as company_profile_service
+from app.graphql.schema import schema
+
+PROFILES_COUNT = 2000
+PAGE_SIZE = 200
+RUNS = 5
+SELECTIONS = {
+    "small": "Id summary { name }",
+    "full": """
+        Id url focus
+        servicesProvided { name percent }
+        summary { name rating noOfReviews description minProjectSize averageHourlyRate employees }
+        reviews {
+            name datePublished
+            project { name category allCategories size length description }
+            reviewer { title name industry size location reviewType isVerified linkedinUrl }
+            review { rating quality schedule cost willingToRefer comments }
+            content { label text }
+        }
+    """
+}
+
+created = {"objects": 0}
+
+def count_instances(cls):
+    init = cls.__init__
+
+    def counted_init(self, *args, **kwargs):
+        created["objects"] += 1
+        init(self, *args, **kwargs)
+
+    cls.__init__ = counted_init
+
+def build_profile(rnd: random.Random, i: int) -> dict:
+    return {
+        "url": f"https://clutch.co/profile/benchmark-{i}",
+        "focus": ["Web Development", "Web Scraping"],
+        "servicesProvided": [{"name": "Web Development", "percent": 60.0}, {"name": "Web Scraping", "percent": 40.0}],
+        "summary": {
+            "name": f"Benchmark {i}", "rating": 4.8, "noOfReviews": 10, "description": "Benchmark company. " * 20,
+            "minProjectSize": "$10,000+", "averageHourlyRate": "$25 - $49 / hr", "employees": "50 - 249"
+        },
+        "reviews": [
+            {
+                "name": f"Project {j}",
+                "datePublished": "2024-01-01",
+                "project": {"name": f"Project {j}", "category": "Web Scraping", "allCategories": ["Web Scraping"], "size": "$10,000 to $49,999", "length": "Jan. - Jun. 2024", "description": "Scraping project."},
+                "reviewer": {"title": "CEO", "name": "Anonymous", "industry": "Retail", "size": "11-50 Employees", "location": "Austin, Texas", "reviewType": "Online Review", "isVerified": True},
+                "review": {"rating": 5, "quality": 5, "schedule": 5, "cost": 5, "willingToRefer": 5, "comments": "Great work. " * 10},
+                "content": [{"label": "BACKGROUND", "text": "We are a retailer. " * 20}, {"label": "SOLUTION", "text": "They scraped prices. " * 20}]
+            }
+            for j in range(rnd.randint(5, 15))
+        ]
+    }
+
+async def main():
+    collection = database["company_profiles_benchmark"]
+    await collection.drop()
+    rnd = random.Random(7)
+    for i in range(0, PROFILES_COUNT, 1000):
+        await collection.insert_many([build_profile(rnd, j) for j in range(i, i + 1000)])
+
+    company_profile_service.company_profiles = collection
+    for cls in [types.Profile, types.Service, types.Summary, types.Review, types.Project, types.Reviewer, types.ReviewDetails, types.Content]:
+        count_instances(cls)
+
+    for name, selection in SELECTIONS.items():
+        query = f"{{ getProfiles(first: {PAGE_SIZE}) {{ edges {{ node {{ {selection} }} }} }} }}"
+        created["objects"] = 0
+        tracemalloc.start()
+        started_at = time.perf_counter()
+        for _ in range(RUNS):
+            result = await schema.execute(query)
+            if result.errors:
+                raise result.errors[0]
+        latency = (time.perf_counter() - started_at) / RUNS
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:>6}: {latency * 1000:.0f}ms, {created['objects'] / RUNS:.0f} objects, peak {peak / 1e6:.1f}MB per page of {PAGE_SIZE}")
+
+    await collection.drop()
+
+asyncio.run(main())
@@ -0,0 +1,61 @@
+import asyncio
+import time
+import uuid
+from app.db import database
+from app.indexes import ensure_collection_indexes, COMPANY_PROFILE_INDEXES
+from app.services.company_profile_service import insert_items
+
+PROFILES_COUNT = 10000
+BATCH_SIZE = 50
+
+def build_profiles(count: int, offset: int = 0):
+    return [
+        {
+            "url": f"https://clutch.co/profile/benchmark-{offset + i}",
+            "summary": {"name": f"Benchmark {offset + i}", "rating": 4.8, "noOfReviews": 3},
+            "focus": ["Web Development", "Web Scraping"],
+            "reviews": [
+                {
+                    "name": f"Project {j}",
+                    "reviewer": {"name": f"Reviewer {j}", "location": "Austin, Texas", "industry": "Advertising & marketing"},
+                    "content": [{"label": "BACKGROUND", "text": "We are a marketing agency. " * 20}]
+                }
+                for j in range(3)
+            ]
+        }
+        for i in range(count)
+    ]
+
+async def insert_items_legacy(items, collection):
+    to_update = []
+    for item in items:
+        existing = await collection.find_one({"url": item["url"]})
+        if existing is None:
+            item["id"] = str(uuid.uuid4())
+            to_update.append(item)
+    if to_update:
+        await collection.insert_many(to_update)
+
+async def run(name: str, insert, collection, profiles):
+    started_at = time.perf_counter()
+    for i in range(0, len(profiles), BATCH_SIZE):
+        await insert(profiles[i:i + BATCH_SIZE], collection)
+    elapsed = time.perf_counter() - started_at
+    print(f"{name:>32}: {elapsed:.2f}s, {len(profiles) / elapsed:.0f} profiles/s")
+
+async def main():
+    collection = database["company_profiles_benchmark"]
+
+    for name, insert in [
+        ("legacy find_one + insert", insert_items_legacy),
+        ("bulk upsert", lambda items, collection: insert_items(items, collection=collection))
+    ]:
+        await collection.drop()
+        await ensure_collection_indexes(collection, COMPANY_PROFILE_INDEXES)
+        await run(f"{name} (new)", insert, collection, build_profiles(PROFILES_COUNT))
+        # Second pass: half of the batch already exists.
+        await run(f"{name} (mixed)", insert, collection, build_profiles(PROFILES_COUNT, PROFILES_COUNT // 2))
+
+    await collection.drop()
+
+asyncio.run(main())
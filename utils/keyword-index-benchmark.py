@@ -0,0 +1,89 @@
+import asyncio
+import random
+import time
+from app.config import settings
+from app.db import database
+from app.indexes import ensure_collection_indexes, COMPANY_PROFILE_INDEXES
+import app.services.company_profile_service as company_profile_service
+
+CORPUS_SIZES = [2000, 8000, 32000]
+RUNS = 5
+SENTENCES = [
+    "We are a marketing agency working with retail brands.",
+    "We sell shoes and apparel online.",
+    "Our logistics company ships across Europe.",
+    "They scraped competitor prices every day.",
+    "They built a mobile app for our customers.",
+    "They migrated our platform to the cloud.",
+    "Traffic grew and the project was delivered on time.",
+    "Communication was great and we would work with them again."
+]
+RARE_SENTENCE = "We needed pricing intelligence for our pharmacy chain."
+SEARCHES = {
+    "rare keyword": {"background_client_keywords": ["pharmacy"]},
+    "two keywords": {"solution_client_keywords": ["scrap", "mobile app"]},
+    "mixed labels": {"background_client_keywords": ["logistics"], "feedback_client_keywords": ["delivered"]}
+}
+
+def build_profile(rnd: random.Random, i: int) -> dict:
+    return {
+        "url": f"https://clutch.co/profile/benchmark-{i}",
+        "summary": {"name": f"Benchmark {i}", "noOfReviews": 5},
+        "reviews": [
+            {
+                "name": f"Project {j}",
+                "content": [
+                    {"label": label, "text": " ".join(rnd.sample(SENTENCES, 3) + ([RARE_SENTENCE] if rnd.random() < 0.002 else []))}
+                    for label in ["BACKGROUND", "OPPORTUNITY / CHALLENGE", "SOLUTION", "RESULTS & FEEDBACK"]
+                ]
+            }
+            for j in range(5)
+        ]
+    }
+
+def find_docs_examined(explain) -> int:
+    if isinstance(explain, dict):
+        if "totalDocsExamined" in explain:
+            return explain["totalDocsExamined"]
+        return sum(find_docs_examined(value) for value in explain.values())
+    if isinstance(explain, list):
+        return sum(find_docs_examined(value) for value in explain)
+    return 0
+
+async def measure(collection, filters: dict):
+    pipeline = company_profile_service.build_search_profiles_pipeline(**filters)
+    explain = await database.command({
+        "explain": {"aggregate": collection.name, "pipeline": pipeline, "cursor": {}},
+        "verbosity": "executionStats"
+    })
+    started_at = time.perf_counter()
+    for _ in range(RUNS):
+        await company_profile_service.search_profiles(**filters)
+    return (time.perf_counter() - started_at) / RUNS, find_docs_examined(explain)
+
+async def main():
+    collection = database["company_profiles_benchmark"]
+    await collection.drop()
+    await ensure_collection_indexes(collection, COMPANY_PROFILE_INDEXES)
+    company_profile_service.company_profiles = collection
+    rnd = random.Random(7)
+    inserted = 0
+
+    for size in CORPUS_SIZES:
+        for i in range(inserted, size, 1000):
+            await company_profile_service.insert_items([build_profile(rnd, j) for j in range(i, min(i + 1000, size))], collection=collection)
+        inserted = size
+
+        for name, filters in SEARCHES.items():
+            settings.REVIEW_KEYWORD_INDEX_ENABLED = False
+            scan_latency, scan_examined = await measure(collection, filters)
+            settings.REVIEW_KEYWORD_INDEX_ENABLED = True
+            index_latency, index_examined = await measure(collection, filters)
+            print(
+                f"{size:>6} profiles, {name:>13}: scan {scan_latency * 1000:.0f}ms ({scan_examined} docs examined), "
+                f"index {index_latency * 1000:.0f}ms ({index_examined} docs examined)"
+            )
+
+    await collection.drop()
+
+asyncio.run(main())
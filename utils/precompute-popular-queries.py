@@ -0,0 +1,15 @@
+import asyncio
+import sys
+from app.config import settings
+from app.services.popular_query_service import find_popular_requests, precompute_popular_queries
+
+async def main():
+    for request in await find_popular_requests():
+        print(f"{request['request_type']:>7}: {request['query']}")
+    print(await precompute_popular_queries())
+
+# A local cache lives only in this process, so the results would be lost on exit.
+if settings.RESULT_CACHE_BACKEND != "redis":
+    sys.exit("Precomputed queries are only shared through Redis; set RESULT_CACHE_BACKEND=redis.")
+
+asyncio.run(main())
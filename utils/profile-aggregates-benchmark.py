@@ -0,0 +1,94 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from app.db import database
+import app.services.company_profile_service as company_profile_service
+
+REVIEWS_COUNT = 100000
+REVIEWS_PER_PROFILE = 10
+RUNS = 5
+INDUSTRIES = ["Advertising & marketing", "Financial services", "Information technology", "Healthcare", "Retail"]
+LOCATIONS = ["Austin, Texas", "London, United Kingdom", "Berlin, Germany", "Toronto, Canada", "Sydney, Australia"]
+SIZES = ["Less than $10,000", "$10,000 to $49,999", "$50,000 to $199,999", "$200,000 to $999,999"]
+CATEGORIES = ["Web Development", "Web Scraping", "Mobile App Development", "Custom Software Development"]
+SEARCHES = {
+    "all profiles": {},
+    "industry": {"industry_names": ["marketing"]}
+}
+
+def aggregate_in_python(profiles: list) -> dict:
+    reviews_counter = 0
+    industries_counter = Counter()
+    locations_counter = Counter()
+    sizes_counter = Counter()
+    categories_counter = Counter()
+
+    for profile in profiles:
+        for review in profile.get("reviews") or []:
+            industry = review.get("reviewer", {}).get("industry")
+            location = review.get("reviewer", {}).get("location")
+            size = review.get("project", {}).get("size")
+            category = review.get("project", {}).get("category")
+            reviews_counter += 1
+
+            if industry:
+                industries_counter[industry] += 1
+            if location:
+                locations_counter[location.split(",")[-1].strip()] += 1
+            if size:
+                sizes_counter[size] += 1
+            if category:
+                categories_counter[category] += 1
+
+    return {
+        "company_count": len(profiles),
+        "reviews_count": reviews_counter,
+        "by_industries": sorted(industries_counter.items(), key=lambda x: x[1], reverse=True),
+        "by_locations": sorted(locations_counter.items(), key=lambda x: x[1], reverse=True),
+        "by_project_sizes": sorted(sizes_counter.items(), key=lambda x: x[1], reverse=True),
+        "by_project_categories": sorted(categories_counter.items(), key=lambda x: x[1], reverse=True)
+    }
+
+def build_profile(rnd: random.Random, i: int) -> dict:
+    return {
+        "url": f"https://clutch.co/profile/benchmark-{i}",
+        "summary": {"name": f"Benchmark {i}", "noOfReviews": REVIEWS_PER_PROFILE},
+        "reviews": [
+            {
+                "name": f"Project {j}",
+                "project": {"name": f"Project {j}", "category": rnd.choice(CATEGORIES), "size": rnd.choice(SIZES)},
+                "reviewer": {"name": "Anonymous", "industry": rnd.choice(INDUSTRIES), "location": rnd.choice(LOCATIONS)},
+                "content": [{"label": "BACKGROUND", "text": "We are a marketing agency. " * 20}]
+            }
+            for j in range(REVIEWS_PER_PROFILE)
+        ]
+    }
+
+async def timed(fn) -> float:
+    started_at = time.perf_counter()
+    for _ in range(RUNS):
+        await fn()
+    return (time.perf_counter() - started_at) / RUNS
+
+async def main():
+    collection = database["company_profiles_benchmark"]
+    await collection.drop()
+    rnd = random.Random(7)
+    profiles_count = REVIEWS_COUNT // REVIEWS_PER_PROFILE
+    for i in range(0, profiles_count, 1000):
+        await collection.insert_many([build_profile(rnd, j) for j in range(i, min(i + 1000, profiles_count))])
+
+    company_profile_service.company_profiles = collection
+
+    for name, filters in SEARCHES.items():
+        async def run_python():
+            aggregate_in_python(await company_profile_service.search_profiles(**filters))
+
+        python_latency = await timed(run_python)
+        facet_latency = await timed(lambda: company_profile_service.aggregate_profiles(**filters))
+        print(f"{name:>12}: python counters {python_latency * 1000:.0f}ms, $facet {facet_latency * 1000:.0f}ms")
+
+    await collection.drop()
+
+asyncio.run(main())
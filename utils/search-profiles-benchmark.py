@@ -0,0 +1,258 @@
+import asyncio
+import random
+import re
+import time
+import bson
+from bson import ObjectId
+from typing import List, Optional
+from app.db import database
+import app.services.company_profile_service as company_profile_service
+
+PROFILES_COUNT = 20000
+RUNS = 5
+INDUSTRIES = ["Advertising & marketing", "Financial services", "Information technology", "Healthcare", "Retail"]
+TITLES = ["CEO, Acme", "CTO", "Marketing Manager", "Head of Growth", "Founder"]
+FOCUS = ["Web Development", "Web Scraping", "Mobile App Development", "Custom Software Development"]
+SEARCHES = {
+    "industry": {"industry_names": ["marketing"]},
+    "title + background": {"reviewer_titles": ["ceo", "founder"], "background_client_keywords": ["agency"]},
+    "focus + solution": {"focus_names": ["Web Scraping"], "solution_client_keywords": ["scrap"]},
+    "without linkedin": {"include_only_profiles_without_linkedin_url": True, "min_reviews": 5}
+}
+
+transferred = {"legacy": 0, "pipeline": 0}
+
+async def search_profiles_legacy(
+    collection,
+    reviewer_names: Optional[List[str]] = None,
+    exclude_anonymous: Optional[bool] = False,
+    focus_names: Optional[List[str]] = None,
+    project_focus_names: Optional[List[str]] = None,
+    min_reviews: Optional[int] = None,
+    max_reviews: Optional[int] = None,
+    include_only_profiles_with_linkedin_url: Optional[bool] = False,
+    include_only_profiles_without_linkedin_url: Optional[bool] = False,
+    ids: Optional[List[str]] = None,
+    industry_names: Optional[List[str]] = None,
+    reviewer_titles: Optional[List[str]] = None,
+    background_client_keywords: Optional[List[str]] = None,
+    challenge_client_keywords: Optional[List[str]] = None,
+    solution_client_keywords: Optional[List[str]] = None,
+    feedback_client_keywords: Optional[List[str]] = None,
+) -> List[dict]:
+    any_filters_applied = any([
+        reviewer_names,
+        exclude_anonymous,
+        focus_names, 
+        project_focus_names, 
+        min_reviews, 
+        max_reviews,
+        include_only_profiles_with_linkedin_url, 
+        include_only_profiles_without_linkedin_url,
+        ids, 
+        industry_names,
+        reviewer_titles, 
+        background_client_keywords, 
+        challenge_client_keywords,
+        solution_client_keywords, 
+        feedback_client_keywords
+    ])
+
+    if not any_filters_applied:
+        return await collection.find().to_list(length=None)
+
+    query = {}
+
+    if focus_names:
+        regex_pattern = "|".join([re.escape(focus_name) for focus_name in focus_names])
+        query["focus"] = {"$regex": regex_pattern, "$options": "i"}
+
+    if min_reviews is not None:
+        query.setdefault("summary.noOfReviews", {})["$gte"] = min_reviews
+    if max_reviews is not None:
+        query.setdefault("summary.noOfReviews", {})["$lte"] = max_reviews
+
+    if ids:
+        query["_id"] = {"$in": [ObjectId(id) for id in ids]}
+
+    review_query = {}
+
+    if include_only_profiles_with_linkedin_url:
+        review_query["reviewer.linkedinUrl"] = {"$exists": True, "$ne": ""}
+
+    if include_only_profiles_without_linkedin_url:
+        review_query["reviewer.linkedinUrl"] = {"$exists": False }
+
+    if project_focus_names:
+        project_focus_regex_pattern = "|".join([re.escape(name) for name in project_focus_names])
+        review_query["project.allCategories"] = {"$regex": project_focus_regex_pattern, "$options": "i"}
+
+    if reviewer_names:
+        reviewer_names_regex_pattern = "|".join([re.escape(name) for name in reviewer_names])
+        review_query["reviewer.name"] = {"$regex": reviewer_names_regex_pattern, "$options": "i"}
+
+    if industry_names:
+        industries_regex_pattern = "|".join([re.escape(name) for name in industry_names])
+        review_query["reviewer.industry"] = {"$regex": industries_regex_pattern, "$options": "i"}
+
+    if reviewer_titles:
+        titles_regex_pattern = "|".join([re.escape(title) for title in reviewer_titles])
+        review_query["reviewer.title"] = {"$regex": titles_regex_pattern, "$options": "i"}
+
+    background_regex = "|".join([re.escape(keyword) for keyword in background_client_keywords]) if background_client_keywords else None
+    challenge_regex = "|".join([re.escape(keyword) for keyword in challenge_client_keywords]) if challenge_client_keywords else None
+    solution_regex = "|".join([re.escape(keyword) for keyword in solution_client_keywords]) if solution_client_keywords else None
+    feedback_regex = "|".join([re.escape(keyword) for keyword in feedback_client_keywords]) if feedback_client_keywords else None
+    
+    label_conditions = []
+
+    if background_client_keywords:
+        label_conditions.append(
+            {"content": {"$elemMatch": {"label": "BACKGROUND", "text": {"$regex": background_regex, "$options": "i"}}}}
+        )
+
+    if challenge_client_keywords:
+        label_conditions.append(
+            {"content": {"$elemMatch": {"label": "OPPORTUNITY / CHALLENGE", "text": {"$regex": challenge_regex, "$options": "i"}}}}
+        )
+
+    if solution_client_keywords:
+        label_conditions.append(
+            {"content": {"$elemMatch": {"label": "SOLUTION", "text": {"$regex": solution_regex, "$options": "i"}}}}
+        )
+
+    if feedback_client_keywords:
+        label_conditions.append(
+            {"content": {"$elemMatch": {"label": "RESULTS & FEEDBACK", "text": {"$regex": feedback_regex, "$options": "i"}}}}
+        )
+
+    if label_conditions:
+        review_query["$or"] = label_conditions
+
+    if review_query:
+        query["reviews"] = {"$elemMatch": review_query}
+
+    items = await collection.find(query).to_list(length=None)
+    transferred["legacy"] += sum(len(bson.encode(item)) for item in items)
+
+    for item in items:
+        if "reviews" in item and item["reviews"]:
+            filtered_reviews = []
+
+            for review in item["reviews"]:
+                reviewer = review.get("reviewer", {})
+
+                matches_reviewer_industry = (
+                    not industry_names or any(re.search(rf"{re.escape(industry)}", reviewer.get("industry", ""), re.IGNORECASE) for industry in industry_names)
+                )
+
+                matches_reviewer_name = (
+                    not reviewer_names or any(re.search(rf"{re.escape(name)}", reviewer.get("name", ""), re.IGNORECASE) for name in reviewer_names)
+                )
+
+                matches_reviewer_title = (
+                    not reviewer_titles or any(re.search(rf"{re.escape(title)}", reviewer.get("title", ""), re.IGNORECASE) for title in reviewer_titles)
+                )
+
+                has_linkedin_url = (
+                    not include_only_profiles_with_linkedin_url 
+                    or (
+                        reviewer.get("linkedinUrl") 
+                        and "linkedin.com/in/" in reviewer.get("linkedinUrl")
+                    )
+                )
+
+                does_not_has_linkedin_url = (
+                    not include_only_profiles_without_linkedin_url 
+                    or ("linkedinUrl" not in reviewer or not reviewer.get("linkedinUrl"))
+                )
+
+                if not (matches_reviewer_name and matches_reviewer_industry and matches_reviewer_title and has_linkedin_url and does_not_has_linkedin_url):
+                    continue
+
+                if not (
+                    background_client_keywords
+                    or challenge_client_keywords
+                    or solution_client_keywords
+                    or feedback_client_keywords
+                ):
+                    filtered_reviews.append(review)
+                    continue
+                    
+
+                matches_content = any(
+                    (background_client_keywords and c["label"] == "BACKGROUND" and re.search(background_regex, c["text"], re.IGNORECASE))
+                    or (challenge_client_keywords and c["label"] == "OPPORTUNITY / CHALLENGE" and re.search(challenge_regex, c["text"], re.IGNORECASE))
+                    or (solution_client_keywords and c["label"] == "SOLUTION" and re.search(solution_regex, c["text"], re.IGNORECASE))
+                    or (feedback_client_keywords and c["label"] == "RESULTS & FEEDBACK" and re.search(feedback_regex, c["text"], re.IGNORECASE))
+                    for c in review.get("content", [])
+                )
+
+                if matches_content:
+                    filtered_reviews.append(review)
+
+            item["reviews"] = filtered_reviews
+
+    return [item for item in items if item["reviews"]]
+
+def build_profile(rnd: random.Random, i: int) -> dict:
+    reviews = [
+        {
+            "name": f"Project {j}",
+            "project": {"name": f"Project {j}", "category": rnd.choice(FOCUS), "allCategories": rnd.sample(FOCUS, 2), "size": "$10,000 to $49,999"},
+            "reviewer": {
+                "name": rnd.choice(["Anonymous", "John Doe", "Jane Roe"]),
+                "title": rnd.choice(TITLES),
+                "industry": rnd.choice(INDUSTRIES),
+                "location": "Austin, Texas"
+            },
+            "content": [
+                {"label": "BACKGROUND", "text": rnd.choice(["We are a marketing agency.", "We sell shoes online."]) * 15},
+                {"label": "OPPORTUNITY / CHALLENGE", "text": "We needed reliable pricing data. " * 15},
+                {"label": "SOLUTION", "text": rnd.choice(["They scraped competitor sites.", "They built a mobile app."]) * 15},
+                {"label": "RESULTS & FEEDBACK", "text": "The project was delivered on time. " * 15}
+            ]
+        }
+        for j in range(rnd.randint(1, 15))
+    ]
+    return {
+        "url": f"https://clutch.co/profile/benchmark-{i}",
+        "summary": {"name": f"Benchmark {i}", "noOfReviews": len(reviews)},
+        "focus": rnd.sample(FOCUS, 2),
+        "reviews": reviews
+    }
+
+async def timed(fn) -> float:
+    started_at = time.perf_counter()
+    for _ in range(RUNS):
+        await fn()
+    return (time.perf_counter() - started_at) / RUNS
+
+async def main():
+    collection = database["company_profiles_benchmark"]
+    await collection.drop()
+    rnd = random.Random(7)
+    for i in range(0, PROFILES_COUNT, 1000):
+        await collection.insert_many([build_profile(rnd, j) for j in range(i, i + 1000)])
+
+    company_profile_service.company_profiles = collection
+
+    for name, filters in SEARCHES.items():
+        transferred["legacy"] = 0
+        legacy_latency = await timed(lambda: search_profiles_legacy(collection, **filters))
+
+        async def run_pipeline():
+            items = await company_profile_service.search_profiles(**filters)
+            transferred["pipeline"] += sum(len(bson.encode(item)) for item in items)
+
+        transferred["pipeline"] = 0
+        pipeline_latency = await timed(run_pipeline)
+
+        print(
+            f"{name:>20}: legacy {legacy_latency * 1000:.0f}ms / {transferred['legacy'] / RUNS / 1e6:.1f}MB, "
+            f"pipeline {pipeline_latency * 1000:.0f}ms / {transferred['pipeline'] / RUNS / 1e6:.1f}MB"
+        )
+
+    await collection.drop()
+
+asyncio.run(main())
@@ -0,0 +1,72 @@
+import asyncio
+import random
+import time
+from app.db import database
+from app.indexes import ensure_collection_indexes, COMPANY_PROFILE_INDEXES
+import app.services.company_profile_service as company_profile_service
+
+PROFILES_COUNT = 20000
+TOP_K = 20
+RUNS = 5
+FOCUS = ["Web Development", "Web Scraping", "Mobile App Development", "Custom Software Development", "Cloud Consulting"]
+INDUSTRIES = ["Advertising & marketing", "Financial services", "Information technology", "Healthcare", "Retail"]
+SENTENCES = [
+    "We are a marketing agency working with retail brands.",
+    "We sell shoes and apparel online.",
+    "They scraped competitor prices every day.",
+    "They built a mobile app for our customers.",
+    "They migrated our platform to the cloud.",
+    "The project was delivered on time."
+]
+SEARCHES = {
+    "focus": {"focus_names": ["Web Scraping"]},
+    "focus + industry": {"focus_names": ["Web Scraping"], "industry_names": ["retail"]},
+    "solution keywords": {"solution_client_keywords": ["scraped", "crawler"]},
+    "keywords + reviews": {"background_client_keywords": ["marketing"], "min_reviews": 5, "max_reviews": 10}
+}
+
+def build_profile(rnd: random.Random, i: int) -> dict:
+    reviews_count = rnd.randint(1, 15)
+    return {
+        "url": f"https://clutch.co/profile/benchmark-{i}",
+        "summary": {"name": f"Benchmark {i}", "noOfReviews": reviews_count, "description": " ".join(rnd.sample(SENTENCES, 2))},
+        "focus": rnd.sample(FOCUS, 2),
+        "reviews": [
+            {
+                "name": f"Project {j}",
+                "reviewer": {"name": "Anonymous", "industry": rnd.choice(INDUSTRIES)},
+                "content": [
+                    {"label": label, "text": " ".join(rnd.sample(SENTENCES, 2))}
+                    for label in ["BACKGROUND", "OPPORTUNITY / CHALLENGE", "SOLUTION", "RESULTS & FEEDBACK"]
+                ]
+            }
+            for j in range(reviews_count)
+        ]
+    }
+
+async def timed(fn) -> tuple:
+    started_at = time.perf_counter()
+    for _ in range(RUNS):
+        result = await fn()
+    return (time.perf_counter() - started_at) / RUNS, len(result)
+
+async def main():
+    collection = database["company_profiles_benchmark"]
+    await collection.drop()
+    await ensure_collection_indexes(collection, COMPANY_PROFILE_INDEXES)
+    company_profile_service.company_profiles = collection
+    rnd = random.Random(7)
+    for i in range(0, PROFILES_COUNT, 1000):
+        await company_profile_service.insert_items([build_profile(rnd, j) for j in range(i, i + 1000)], collection=collection)
+
+    for name, filters in SEARCHES.items():
+        regex_latency, regex_count = await timed(lambda: company_profile_service.search_profiles(**filters))
+        text_latency, text_count = await timed(lambda: company_profile_service.search_profiles_v2(**filters, top_k=TOP_K))
+        print(
+            f"{name:>18}: regex {regex_latency * 1000:.0f}ms ({regex_count} profiles), "
+            f"ranked text {text_latency * 1000:.0f}ms (top {text_count})"
+        )
+
+    await collection.drop()
+
+asyncio.run(main())
@@ -0,0 +1,52 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 5
+FIRST_QUERY = "{ getProfiles(first: 1) { edges { node { Id } } } }"
+
+def measure():
+    """Runs in a fresh interpreter, so module caches and clients start cold."""
+    started_at = time.perf_counter()
+    from fastapi.testclient import TestClient
+    from app.main import app
+    imported_at = time.perf_counter()
+
+    with TestClient(app) as client:
+        started_up_at = time.perf_counter()
+        response = client.post("/graphql", json={"query": FIRST_QUERY})
+        response.raise_for_status()
+        first_request_at = time.perf_counter()
+
+    print(json.dumps({
+        "import_ms": (imported_at - started_at) * 1000,
+        "startup_ms": (started_up_at - imported_at) * 1000,
+        "first_request_ms": (first_request_at - started_up_at) * 1000,
+        "time_to_first_request_ms": (first_request_at - started_at) * 1000
+    }))
+
+def run(warm_up: bool) -> dict:
+    env = {**os.environ, "CLIENTS_WARM_UP_ENABLED": str(warm_up).lower()}
+    samples = []
+    for _ in range(RUNS):
+        output = subprocess.run([sys.executable, __file__, "measure"], env=env, capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+def main():
+    for warm_up in [True, False]:
+        result = run(warm_up)
+        print(
+            f"warm-up {'on ' if warm_up else 'off'}: import {result['import_ms']:.0f}ms, startup {result['startup_ms']:.0f}ms, "
+            f"first request {result['first_request_ms']:.0f}ms, time to first request {result['time_to_first_request_ms']:.0f}ms "
+            f"(median of {RUNS})"
+        )
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["measure"]:
+        measure()
+    else:
+        main()